@@ -1,2 +1,3 @@
 from .action import *
 from .reco import *
+from . import sink
@@ -1,15 +1,19 @@
 import os
 import json
 from datetime import datetime
-from time import sleep
-import random
 
-from PIL import Image
 from maa.agent.agent_server import AgentServer
 from maa.custom_action import CustomAction
 from maa.context import Context
 
 from utils import logger
+from utils.image_writer import ImageJob, image_writer
+from utils.frame_buffer import frame_buffer
+from utils.abort import abort_signal
+from utils.dedup import DEFAULT_THRESHOLD, dhash, get_hash_index
+from utils.archive import get_frame_archive
+from utils.delay import delay_budget, resolve_profile, sample_delay
+from utils.wait import cancellable_sleep
 from custom.reco import Count
 
 
@@ -23,8 +27,24 @@ class Screenshot(CustomAction):
         "save_dir": "保存截图的目录路径",
         "format": "jpeg 或 png，默认 jpeg",
         "quality": 70,  # jpeg 压缩质量（1-95），仅在 format=jpeg 时生效
-        "gray": false   # 是否转为灰度图
+        "gray": false,  # 是否转为灰度图
+        "backpressure": "drop_oldest 或 block，默认 drop_oldest",
+        "dedup": {      # 可选，与最近保存的截图近似时不再重复保存
+            "mode": "skip 或 link",
+            "threshold": 4  # dHash 汉明距离阈值（0-64）
+        },
+        "archive": false  # 是否追加到按天归档的容器文件，而不是每帧一个文件
     }
+
+    编码和写盘在后台线程中完成，写入队列已满时：
+    drop_oldest 丢弃队列中最早的一帧，block 等待队列有空位。
+
+    dedup.mode 为 skip 时直接跳过近似的截图；为 link 时为本次截图创建指向
+    近似截图的硬链接，硬链接失败时照常保存。
+
+    archive 为 true 时截图追加到 save_dir 下的 {日期}.frames，
+    并在 {日期}.index.jsonl 中记录偏移、角色名和时间，可用 tools/screenshot_archive.py 读取；
+    此时 dedup 的 link 模式在索引中追加一条指向已有数据的记录。
     """
 
     def run(
@@ -44,27 +64,17 @@ class Screenshot(CustomAction):
         if abs(aspect_ratio - target_ratio) / target_ratio > 0.01:
             logger.error(f"当前模拟器分辨率不是16:9! 当前分辨率: {width}x{height}")
 
-        # BGR2RGB
-        if len(screen_array.shape) == 3 and screen_array.shape[2] == 3:
-            rgb_array = screen_array[:, :, ::-1]
-        else:
-            rgb_array = screen_array
-            logger.warning("当前截图并非三通道")
-
-        img = Image.fromarray(rgb_array)
-
         # 解析参数
         params = json.loads(argv.custom_action_param)
         save_dir = params["save_dir"]
-        os.makedirs(save_dir, exist_ok=True)
 
         img_format = params.get("format", "jpeg").lower()
         quality = int(params.get("quality", 70))
         gray = bool(params.get("gray", False))
+        backpressure = params.get("backpressure", "drop_oldest")
 
-        # 灰度化
-        if gray:
-            img = img.convert("L")
+        if not (len(screen_array.shape) == 3 and screen_array.shape[2] == 3):
+            logger.warning("当前截图并非三通道")
 
         # 文件名
         node_info = context.get_node_data("重写账号角色信息")
@@ -73,18 +83,86 @@ class Screenshot(CustomAction):
         ext = "jpg" if img_format == "jpeg" else "png"
         save_file_path = f"{save_dir}/{self._get_format_timestamp(now)}-{account_info_dict['rolename']}.{ext}"
 
-        # 保存
-        if img_format == "jpeg":
-            img.save(save_file_path, "JPEG", quality=quality, optimize=True)
-        else:
-            img.save(save_file_path, "PNG", optimize=True)
+        archive = get_frame_archive(save_dir) if params.get("archive", False) else None
+        meta = {
+            "day": now.strftime("%Y.%m.%d"),
+            "rolename": account_info_dict["rolename"],
+            "time": now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "format": img_format,
+        }
+
+        dedup = params.get("dedup")
+        if dedup and self._dedup(
+            screen_array, save_dir, save_file_path, dedup, archive, meta
+        ):
+            return CustomAction.RunResult(success=True)
 
-        logger.info(f"截图保存至 {save_file_path}")
+        # cached_image 每次返回新的数组，直接交给后台线程编码和写入
+        image_writer.submit(
+            ImageJob(
+                screen_array, save_file_path, img_format, quality, gray, archive, meta
+            ),
+            backpressure,
+        )
 
-        context.tasker.get_task_detail(argv.task_detail.task_id)
+        logger.info(f"截图已提交保存至 {save_file_path}")
 
         return CustomAction.RunResult(success=True)
 
+    def _dedup(
+        self,
+        screen_array,
+        save_dir: str,
+        save_file_path: str,
+        dedup: dict,
+        archive=None,
+        meta: dict = None,
+    ) -> bool:
+        """与最近保存的截图近似时跳过或硬链接，返回是否已处理（无需再保存）"""
+        mode = dedup.get("mode", "skip")
+        threshold = int(dedup.get("threshold", DEFAULT_THRESHOLD))
+
+        index = get_hash_index(save_dir)
+        value = dhash(screen_array)
+        ext = os.path.splitext(save_file_path)[1]
+        similar = index.find(value, threshold, ext)
+
+        if similar is None:
+            index.add(value, os.path.basename(save_file_path))
+            return False
+
+        similar_path = os.path.join(save_dir, similar)
+        if archive is None:
+            exists = lambda: os.path.exists(similar_path)
+        else:
+            exists = lambda: archive.contains(similar)
+
+        if not exists():
+            # 近似截图可能还在写入队列中
+            image_writer.flush()
+        if not exists():
+            logger.debug(f"近似截图 {similar} 已不存在，照常保存")
+            index.add(value, os.path.basename(save_file_path))
+            return False
+
+        if mode == "skip":
+            logger.info(f"截图与 {similar} 近似，跳过保存")
+            return True
+
+        if archive is not None:
+            archive.link(similar, os.path.basename(save_file_path), meta)
+            logger.info(f"截图与 {similar} 近似，已在归档索引中引用")
+            return True
+
+        try:
+            os.link(similar_path, save_file_path)
+            logger.info(f"截图与 {similar} 近似，已创建硬链接 {save_file_path}")
+            return True
+        except OSError as e:
+            logger.warning(f"创建硬链接失败，照常保存截图: {e}")
+            index.add(value, os.path.basename(save_file_path))
+            return False
+
     def _get_format_timestamp(self, now):
 
         date = now.strftime("%Y.%m.%d")
@@ -178,7 +256,19 @@ class ResetCount(CustomAction):
 
 @AgentServer.custom_action("RandomSleep")
 class RandomSleep(CustomAction):
-    """ """
+    """
+    随机延时，模拟人工操作的停顿。
+
+    参数格式:
+    {
+        "profile": "legacy / normal / lognormal / fixed / fast，默认 legacy",
+        "min": 1,  # 可选，覆盖配置中的分布参数（mean、std、median、sigma、value、min、max）
+        "max": 4,
+        "budget": 60  # 可选，当前角色累计延时的上限（秒）
+    }
+
+    各配置的含义见 utils/delay.py。
+    """
 
     def run(
         self,
@@ -186,16 +276,19 @@ class RandomSleep(CustomAction):
         argv: CustomAction.RunArg,
     ) -> CustomAction.RunResult:
 
-        param = json.loads(argv.custom_action_param)
-        t = random.gauss(2, 0.5)
-        if t < 0.5:
-            t = 30
-        if t < 0.8:
-            t = 20
-        if t < 1:
-            t = 10
+        param = json.loads(argv.custom_action_param or "{}") or {}
+        profile = resolve_profile(param)
+        t = sample_delay(profile)
+
+        budget = param.get("budget")
+        if budget is not None:
+            node_info = context.get_node_data("重写账号角色信息")
+            rolename = node_info["action"]["param"]["custom_action_param"].get(
+                "rolename", ""
+            )
+            t = delay_budget.take(rolename, t, float(budget))
         # print("sleep: ", t)
-        sleep(t)
+        cancellable_sleep(context, t)
 
         return CustomAction.RunResult(success=True)
 
@@ -208,7 +301,10 @@ class LogAnError(CustomAction):
         argv: CustomAction.RunArg,
     ) -> CustomAction.RunResult:
 
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open("user_data/error.log", mode="a", encoding="utf-8") as f:
-            f.write(now + "\n")
+        # 通知正在执行的多角色、多任务循环终止后续任务，并追加错误日志
+        abort_signal.set(argv.node_name)
+
+        # 保存出错前的最近几帧画面，缓冲中只有自定义识别用过的帧，先补上当前画面
+        frame_buffer.push(context.tasker.controller.cached_image, argv.node_name)
+        frame_buffer.dump(argv.node_name)
         return CustomAction.RunResult(success=True)
@@ -10,6 +10,12 @@ from utils import logger
 class OverrideLoginInfo(CustomAction):
     """
     在登录角色任务中使用，重写账号角色信息
+
+    可选的 hints 为与上一个登录角色的比较结果
+    {"same_account": bool, "same_server": bool}，
+    退出登录后登录界面显示的是上一个角色的账号和区服，
+    据此可以确定 "当前账号/区服就是要登录的" 节点不会命中，优先走查找流程。
+    hints 只调整 next 列表中节点的识别顺序，不会跳过任何步骤。
     """
 
     def run(
@@ -49,6 +55,36 @@ class OverrideLoginInfo(CustomAction):
             {"检测侧边栏要登录的角色信息并点击": {"expected": servername}}
         )
 
+        hints = cus_param.get("hints")
+        if hints:
+            self._apply_hints(context, hints)
+
         # logger.info(f"#OverrideLoginInfoAction# 覆写登录账号为：{account}, 平台：{platform}, 区服：{servername}, 角色名：{rolename}")
 
         return CustomAction.RunResult(success=True)
+
+    def _apply_hints(self, context: Context, hints: dict) -> None:
+        # 两个节点都显式设置，避免沿用上一个角色的覆盖结果
+        account_next = [
+            "TASK-A-3-0识别到当前账号就是要登录的账号",
+            "TASK-A-3-1检测已经打开了账号选择列表开始查找账号",
+        ]
+        server_next = [
+            "TASK-A-7-0识别到当前区服就是要登录的区服",
+            "TASK-A-7-2检测切换区服按钮并点击",
+            "TASK-A-6检测平台按钮并点击",
+        ]
+        if not hints.get("same_account", False):
+            # 显示的是上一个角色的账号，直接检测账号选择列表
+            account_next.reverse()
+        elif not hints.get("same_server", False):
+            # 同一账号，显示的是上一个角色的区服，直接切换区服
+            server_next[0], server_next[1] = server_next[1], server_next[0]
+
+        context.override_pipeline(
+            {
+                "重写账号角色信息": {"next": account_next},
+                "TASK-A-6检测平台按钮并点击": {"next": server_next},
+            }
+        )
+        logger.debug(f"登录提示: {hints}")
@@ -1,13 +1,50 @@
+import re
 import json
-import os
-from time import sleep
 from datetime import datetime
 from maa.agent.agent_server import AgentServer
 from maa.custom_action import CustomAction
 from maa.context import Context
 
-from utils.account import find_role_info, get_all_rolenames
+from utils.account import get_all_rolenames, get_roles_info
 from utils import logger
+from utils.frame_buffer import frame_buffer
+from utils.abort import AbortMark, abort_signal
+from utils.checkpoint import Checkpoint
+from utils.schedule import count_switches, login_hints, schedule_roles
+from utils.time import get_game_day
+from utils.timing import RunTimer
+from utils.wait import DEFAULT_DIFF_THRESHOLD, wait_for_screen
+
+
+def _dump_frames_if_failed(
+    task_detail, taskname: str, abort_mark: AbortMark
+) -> bool:
+    """
+    子任务失败时保存最近几帧画面，返回是否失败
+
+    LogAnError 已经保存过（abort_mark 之后出现了中止信号）时不再重复保存；
+    on_error 为空的节点不会走到 LogAnError，由这里保存。
+    """
+    if task_detail is None or task_detail.status.failed:
+        logger.warning(f"任务 {taskname} 执行失败")
+        if not abort_signal.is_set_since(abort_mark):
+            frame_buffer.dump(taskname)
+        return True
+    return False
+
+
+def _wait_after_task(
+    context: Context, task: dict, default_mode: str, abort_mark: AbortMark
+) -> None:
+    """子任务之后的等待，wait 为上限，wait_mode 为 stable 时画面稳定或 ready 节点出现即结束"""
+    wait_for_screen(
+        context,
+        task["wait"],
+        task.get("wait_mode", default_mode),
+        task.get("ready"),
+        task.get("stable_threshold", DEFAULT_DIFF_THRESHOLD),
+        abort_mark=abort_mark,
+    )
 
 
 @AgentServer.custom_action("RunTaskList")
@@ -20,14 +57,65 @@ class RunTaskList(CustomAction):
 
         tasks = cus_param["tasks"]
         # logger.info(f"#RunTaskList# 传入的 tasks 参数为：{tasks}")
+        wait_mode = cus_param.get("wait_mode", "fixed")
+
+        abort_mark = abort_signal.mark()
+        timer = RunTimer("RunTaskList", tasks=[task["taskname"] for task in tasks])
 
         for task in tasks:
+            if context.tasker.stopping:
+                logger.info("任务已停止，终止后续任务")
+                timer.abort()
+                return
+            if abort_signal.is_set_since(abort_mark):
+                logger.error("检测到任务执行过程出错，终止后续任务")
+                timer.abort()
+                return
+            timer.task_start(task["taskname"])
             task_detail = context.run_task(task["taskname"])
-            sleep(task["wait"])
+            failed = _dump_frames_if_failed(
+                task_detail, task["taskname"], abort_mark
+            )
+            timer.task_end(task["taskname"], not failed)
+            _wait_after_task(context, task, wait_mode, abort_mark)
+
+        timer.run_end()
 
 
 @AgentServer.custom_action("ForRolesToRunTask")
 class ForRolesToRunTask(CustomAction):
+    """
+    对多个角色依次执行任务列表。
+
+    参数格式:
+    {
+        "rolenames": "角色名列表，ALL 表示 account_info.csv 中的全部角色",
+        "tasks": [
+            {"taskname": "任务名", "wait": 0.5, "always": false, "login": false},
+            ...
+        ],
+        "resume": false,
+        "schedule": "none",
+        "precheck": false,
+        "wait_mode": "fixed"
+    }
+
+    每个 (角色, 任务) 成功完成后写入当天（5 点刷新）的断点记录。
+    resume 为 true 时跳过断点记录中已完成的 (角色, 任务)；
+    always 为 true 的任务（如登录、退出登录）不记录，只要该角色还有未完成的任务就会执行，
+    角色的其他任务都已完成时整个角色跳过。
+
+    schedule 为 login 时按 平台 -> 账号 -> 区服 对角色分组排序，减少登录时的切换；
+    每个角色登录前会把与上一个角色是否同账号、同区服作为 hints 传给登录流程。
+
+    precheck 为 true 时（默认 false），第一个执行的角色在登录前先检查游戏当前
+    是否已登录该角色（庭院中打开个人信息，角色名和区服都整串匹配），
+    是则跳过 login 为 true 的任务。
+
+    每个任务之后最多等待 wait 秒。wait_mode 为 stable 时画面稳定后即结束等待，
+    任务中可以用 wait_mode 单独指定，用 ready 指定等待出现的节点、
+    stable_threshold 指定画面差异阈值，见 utils/wait.py。
+    """
 
     def run(
         self, context: Context, argv: CustomAction.RunArg
@@ -62,57 +150,133 @@ class ForRolesToRunTask(CustomAction):
         if rolenames and rolenames[0] == "ALL":
             rolenames = get_all_rolenames()
 
+        roles_info = get_roles_info(rolenames)
+        schedule = cus_param.get("schedule", "none")
+        if schedule != "none":
+            before = count_switches(rolenames, roles_info)
+            rolenames = schedule_roles(rolenames, roles_info, schedule)
+            after = count_switches(rolenames, roles_info)
+            logger.info(f"角色排序 {schedule}：切换次数 {before} -> {after}")
+
         all_num = len(rolenames)
         logger.info(f"解析后的角色数量：{all_num}, 角色名：{rolenames}")
 
-        task_begin_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        os.makedirs("user_data", exist_ok=True)
+        checkpoint = Checkpoint(
+            rolenames, [task["taskname"] for task in tasks], get_game_day()
+        )
+        resume = cus_param.get("resume", False)
+        if resume:
+            done_num = checkpoint.load()
+            logger.info(f"从断点继续，已完成 {done_num} 项任务")
+
+        wait_mode = cus_param.get("wait_mode", "fixed")
+        abort_mark = abort_signal.mark()
+        previous_info = None
+        timer = RunTimer(
+            "ForRolesToRunTask",
+            roles=all_num,
+            tasks=[task["taskname"] for task in tasks],
+        )
 
         for index, rolename in enumerate(rolenames):
-            try:
-                with open("user_data/error.log", mode="r", encoding="utf-8") as f:
-                    lines = f.readlines()
-                    last_line = lines[-1].strip() if lines else None
-                    if last_line > task_begin_time:
-                        logger.error("检测到多角色任务执行过程出错，终止后续角色任务")
-                        return
-            except:
-                pass
+            if context.tasker.stopping:
+                logger.info("任务已停止，终止后续角色任务")
+                timer.abort()
+                return
+            if abort_signal.is_set_since(abort_mark):
+                logger.error("检测到多角色任务执行过程出错，终止后续角色任务")
+                timer.abort()
+                return
+
+            role_tasks = tasks
+            if resume:
+                role_tasks = [
+                    task
+                    for task in tasks
+                    if task.get("always", False)
+                    or not checkpoint.is_done(rolename, task["taskname"])
+                ]
+                if all(task.get("always", False) for task in role_tasks):
+                    logger.info(f"角色 {rolename} 的任务已全部完成，跳过")
+                    timer.role_skip(rolename, "done")
+                    continue
 
             now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             logger.info(f"{now} 当前任务角色 {rolename}, {index}/{all_num}")
-            info = find_role_info(rolename)
+            info = roles_info.get(rolename)
             if not info:
+                logger.error(f"未找到角色 {rolename} 的账号信息")
+                timer.role_skip(rolename, "no_info")
                 continue
 
+            timer.role_start(rolename)
+
+            login_info = {
+                "account": info["account"],
+                "platform": info["platform"],
+                "servername": info["servername"],
+                "rolename": rolename,
+            }
+            if previous_info is not None:
+                login_info["hints"] = login_hints(previous_info, info)
             context.override_pipeline(
-                {
-                    "重写账号角色信息": {
-                        "custom_action_param": {
-                            "account": info["account"],
-                            "platform": info["platform"],
-                            "servername": info["servername"],
-                            "rolename": rolename,
-                        }
-                    }
-                }
+                {"重写账号角色信息": {"custom_action_param": login_info}}
             )
 
-            for task in tasks:
-                try:
-                    with open("user_data/error.log", mode="r", encoding="utf-8") as f:
-                        lines = f.readlines()
-                        last_line = lines[-1].strip() if lines else None
-                        if last_line > task_begin_time:
-                            logger.error(
-                                "检测到多角色任务执行过程出错，终止后续角色任务"
-                            )
-                            return
-                except:
-                    pass
+            # 第一个角色：游戏可能已经登录了该角色（如中断后重新运行）
+            if (
+                previous_info is None
+                and cus_param.get("precheck", False)
+                and any(task.get("login", False) for task in role_tasks)
+                and self._is_current_role(context, rolename, info)
+            ):
+                logger.info(f"当前已登录角色 {rolename}，跳过登录")
+                role_tasks = [
+                    task for task in role_tasks if not task.get("login", False)
+                ]
+            previous_info = info
+
+            for task in role_tasks:
+                if context.tasker.stopping:
+                    logger.info("任务已停止，终止后续角色任务")
+                    timer.abort()
+                    return
+                if abort_signal.is_set_since(abort_mark):
+                    logger.error("检测到多角色任务执行过程出错，终止后续角色任务")
+                    timer.abort()
+                    return
+                timer.task_start(task["taskname"])
                 task_detail = context.run_task(task["taskname"])
                 # print("##Task Detail##", task_detail)
-                sleep(task["wait"])
+                failed = _dump_frames_if_failed(
+                task_detail, task["taskname"], abort_mark
+            )
+                timer.task_end(task["taskname"], not failed, task.get("login", False))
+                if not failed and not task.get("always", False):
+                    checkpoint.mark_done(rolename, task["taskname"])
+                _wait_after_task(context, task, wait_mode, abort_mark)
+
+            timer.role_end()
 
         if len(rolenames) >= 3:
             context.run_task("TASK-关闭游戏")
+
+        timer.run_end()
+
+    def _is_current_role(self, context: Context, rolename: str, info: dict) -> bool:
+        """在庭院中打开个人信息，检查当前登录的是否就是该角色"""
+        task_detail = context.run_task(
+            "ENTRY-检查当前登录角色",
+            {
+                # 整串匹配，避免一个角色名包含另一个角色名时误判
+                "RCO-个人信息角色名": {"expected": f"^{re.escape(rolename)}$"},
+                "RCO-个人信息区服名": {
+                    "expected": f"^{re.escape(info['servername'])}$"
+                },
+            },
+        )
+        if task_detail is None:
+            return False
+        return any(
+            node.name == "CHECK-个人信息中是要登录的角色" for node in task_detail.nodes
+        )
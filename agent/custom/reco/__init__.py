@@ -1,6 +1,8 @@
 from .general import *
 from .duiyijingcai import *
 from .jiejietupo import *
+from .grid import *
+from .digits import *
 
 __all__ = [
     "MultiRecognition",
@@ -9,4 +11,6 @@ __all__ = [
     "InitTuPoStatus",
     "IsLastTuPo",
     "GetNextTuPo",
+    "GridScan",
+    "ReadNumber",
 ]
@@ -0,0 +1,133 @@
+"""
+帧级识别结果缓存。
+
+同一帧画面上，同一节点（及相同的节点定义）的识别结果是确定的，
+多个自定义识别或 next 列表中的多个节点重复识别时直接返回缓存结果。
+
+缓存键为 (帧标识, 节点名, 节点定义, override)，帧标识由整帧数据的 CRC32 计算，
+同一个图像对象只计算一次。节点定义取自 context.get_node_data(节点名)，
+即当前 Context 中生效的定义，NodeOverride、OverrideLoginInfo 等通过
+context.override_pipeline 修改节点后，旧定义的缓存结果不会再被命中。
+缓存容量有限，按 LRU 淘汰。
+"""
+
+import json
+import zlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from utils.logger import logger
+from utils.frame_buffer import frame_buffer
+
+# 统计信息的日志输出间隔（查询次数）
+_STATS_LOG_INTERVAL = 500
+
+_MISSING = object()
+
+
+class RecognitionCache:
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_image = None
+        self._last_frame_key: Optional[Tuple] = None
+
+    def frame_key(self, image) -> Tuple:
+        """计算帧标识，同一图像对象复用上次结果"""
+        with self._lock:
+            if image is self._last_image:
+                return self._last_frame_key
+
+        if image.flags["C_CONTIGUOUS"]:
+            checksum = zlib.crc32(image)
+        else:
+            checksum = zlib.crc32(image.tobytes())
+        key = (image.shape, checksum)
+
+        with self._lock:
+            self._last_image = image
+            self._last_frame_key = key
+        return key
+
+    def run_recognition(
+        self,
+        context,
+        entry: str,
+        image,
+        pipeline_override: Optional[Dict] = None,
+    ):
+        """与 context.run_recognition 相同，命中缓存时不再执行识别"""
+        override_key = (
+            json.dumps(pipeline_override, sort_keys=True, ensure_ascii=False)
+            if pipeline_override
+            else ""
+        )
+        node_key = json.dumps(
+            context.get_node_data(entry), sort_keys=True, ensure_ascii=False
+        )
+        key = (self.frame_key(image), entry, node_key, override_key)
+
+        with self._lock:
+            cached = self._entries.get(key, _MISSING)
+            if cached is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._log_stats()
+                return cached
+            self.misses += 1
+            self._log_stats()
+
+        if pipeline_override:
+            reco_detail = context.run_recognition(entry, image, pipeline_override)
+        else:
+            reco_detail = context.run_recognition(entry, image)
+
+        with self._lock:
+            self._entries[key] = reco_detail
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return reco_detail
+
+    def stats(self) -> Dict[str, float]:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._last_image = None
+            self._last_frame_key = None
+
+    def _log_stats(self) -> None:
+        total = self.hits + self.misses
+        if total % _STATS_LOG_INTERVAL == 0:
+            logger.debug(
+                f"识别缓存统计: 命中 {self.hits}, 未命中 {self.misses}, "
+                f"命中率 {self.hits / total:.1%}"
+            )
+
+
+recognition_cache = RecognitionCache()
+
+
+def run_recognition(context, entry: str, image, pipeline_override: Optional[Dict] = None):
+    """使用全局帧级缓存执行识别"""
+    return recognition_cache.run_recognition(context, entry, image, pipeline_override)
+
+
+def push_frame(image, node_name: str) -> None:
+    """
+    将当前帧推入出错排查用的帧缓冲，复用识别缓存的帧标识，同一帧只计算一次 CRC32
+    """
+    frame_buffer.push(image, node_name, recognition_cache.frame_key(image))
@@ -0,0 +1,292 @@
+"""
+游戏固定字体的数字读取。
+
+计数器、押注人数等只包含数字的区域，不需要每次都跑完整的 OCR 模型：
+- 快速路径：在节点 roi 内灰度化、Otsu 二值化、按列投影切分字符，
+  再与数字模板做逐像素比对，全部字符置信度达标时直接返回整数；
+  十个数字的模板都学到之前不启用快速路径
+- 回退路径：置信度不足或没有模板时执行节点本身的 OCR，
+  OCR 结果的字符数与切分结果一致时，用切分出的字符更新该节点的数字模板
+
+模板按节点名分别保存（不同位置的数字字体、颜色可能不同），由 OCR 结果自动学习，
+因此不需要预先准备数字图片。
+"""
+
+import re
+import json
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from maa.agent.agent_server import AgentServer
+from maa.custom_recognition import CustomRecognition
+from maa.context import Context
+from maa.define import RectType
+from utils.logger import logger
+
+from custom.reco.cache import push_frame, run_recognition
+from custom.reco.grid import get_node_roi
+
+# 字符归一化尺寸 (高, 宽)
+GLYPH_SHAPE = (16, 12)
+# 高度低于最高字符该比例的连通列视为噪点（逗号、边框残留等）
+MIN_GLYPH_HEIGHT_RATIO = 0.5
+# 单个数字模板最多累积的样本数
+MAX_TEMPLATE_SAMPLES = 10
+
+DEFAULT_MIN_CONFIDENCE = 0.85
+# 最佳匹配与次佳匹配至少相差的分数
+MIN_MARGIN = 0.05
+
+
+class NumberReading:
+    """
+    数字读取结果
+
+    - value: 整数值
+    - confidence: 置信度，快速路径为所有字符中最低的匹配分数，OCR 路径为 OCR 得分
+    - box: 数字所在区域
+    - source: "digits" 或 "ocr"
+    """
+
+    def __init__(self, value: int, confidence: float, box: RectType, source: str):
+        self.value = value
+        self.confidence = confidence
+        self.box = box
+        self.source = source
+
+    def __repr__(self) -> str:
+        return (
+            f"NumberReading(value={self.value}, confidence={self.confidence:.2f}, "
+            f"box={self.box}, source={self.source})"
+        )
+
+
+def _otsu_threshold(gray: np.ndarray) -> int:
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = gray.size
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    cum_mean = np.cumsum(hist * np.arange(256))
+    mean_bg = cum_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cum_mean[-1] - cum_mean) / np.maximum(weight_fg, 1)
+    between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between))
+
+
+def _binarize(crop: np.ndarray) -> np.ndarray:
+    """BGR 区域 -> 前景为 True 的二值图，前景取像素较少的一侧"""
+    if crop.ndim == 3:
+        gray = crop[..., 0] * 0.114 + crop[..., 1] * 0.587 + crop[..., 2] * 0.299
+        gray = gray.astype(np.uint8)
+    else:
+        gray = crop
+    mask = gray > _otsu_threshold(gray)
+    if mask.mean() > 0.5:
+        mask = ~mask
+    return mask
+
+
+def _normalize_glyph(glyph: np.ndarray) -> np.ndarray:
+    h, w = glyph.shape
+    ys = ((np.arange(GLYPH_SHAPE[0]) + 0.5) * h / GLYPH_SHAPE[0]).astype(np.intp)
+    xs = ((np.arange(GLYPH_SHAPE[1]) + 0.5) * w / GLYPH_SHAPE[1]).astype(np.intp)
+    return glyph[ys][:, xs].astype(np.float32)
+
+
+def segment_glyphs(mask: np.ndarray) -> Tuple[List[np.ndarray], Optional[List[int]]]:
+    """
+    按列投影切分字符
+
+    返回 (归一化后的字符列表, 字符整体在区域内的 [x, y, w, h])
+    """
+    columns = np.concatenate(([False], mask.any(axis=0), [False]))
+    edges = np.diff(columns.astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    pieces = []
+    for start, end in zip(starts, ends):
+        rows = np.flatnonzero(mask[:, start:end].any(axis=1))
+        pieces.append((start, end, rows[0], rows[-1] + 1))
+    if not pieces:
+        return [], None
+
+    max_height = max(bottom - top for _, _, top, bottom in pieces)
+    pieces = [
+        p for p in pieces if p[3] - p[2] >= max_height * MIN_GLYPH_HEIGHT_RATIO
+    ]
+
+    glyphs = [
+        _normalize_glyph(mask[top:bottom, start:end])
+        for start, end, top, bottom in pieces
+    ]
+    left = pieces[0][0]
+    right = pieces[-1][1]
+    top = min(p[2] for p in pieces)
+    bottom = max(p[3] for p in pieces)
+    return glyphs, [int(left), int(top), int(right - left), int(bottom - top)]
+
+
+def _node_roi(context: Context, node_name: str) -> Optional[List[int]]:
+    """节点的固定 roi，节点不存在或 roi 不是坐标时返回 None"""
+    try:
+        roi = get_node_roi(context, node_name)
+    except (TypeError, KeyError):
+        return None
+    if len(roi) != 4 or not all(isinstance(v, int) for v in roi):
+        return None
+    return roi
+
+
+class DigitReader:
+    """按节点名保存数字模板的读取器"""
+
+    def __init__(self):
+        # 节点名 -> 数字字符 -> (模板, 样本数)
+        self._templates: Dict[str, Dict[str, Tuple[np.ndarray, int]]] = {}
+        self._lock = threading.Lock()
+
+    def read(
+        self,
+        context: Context,
+        image: np.ndarray,
+        node_name: str,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    ) -> Optional[NumberReading]:
+        """读取节点 roi 内的整数，读取失败返回 None"""
+        glyphs, glyph_box = [], None
+        roi = _node_roi(context, node_name)
+        if roi is not None:
+            x, y, w, h = roi
+            crop = image[y : y + h, x : x + w]
+            if crop.size:
+                glyphs, glyph_box = segment_glyphs(_binarize(crop))
+
+        if glyphs:
+            fast = self._classify(node_name, glyphs)
+            if fast is not None and fast[1] >= min_confidence:
+                box = [x + glyph_box[0], y + glyph_box[1], glyph_box[2], glyph_box[3]]
+                return NumberReading(int(fast[0]), fast[1], box, "digits")
+
+        reading = self._read_ocr(context, image, node_name)
+        if reading is not None and glyphs:
+            self._learn(node_name, glyphs, str(reading.value))
+        return reading
+
+    def _classify(
+        self, node_name: str, glyphs: List[np.ndarray]
+    ) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            templates = dict(self._templates.get(node_name, {}))
+        # 十个数字都学到之后才启用快速路径，避免未见过的数字被误判为相近的数字
+        if len(templates) < 10:
+            return None
+
+        digits = list(templates)
+        stack = np.stack([templates[d][0] for d in digits])
+        text = ""
+        confidence = 1.0
+        for glyph in glyphs:
+            scores = 1.0 - np.abs(stack - glyph).mean(axis=(1, 2))
+            order = np.argsort(scores)[::-1]
+            best = float(scores[order[0]])
+            second = float(scores[order[1]])
+            if best - second < MIN_MARGIN:
+                return None
+            text += digits[order[0]]
+            confidence = min(confidence, best)
+        return text, confidence
+
+    def _learn(self, node_name: str, glyphs: List[np.ndarray], text: str) -> None:
+        if len(glyphs) != len(text):
+            return
+        with self._lock:
+            templates = self._templates.setdefault(node_name, {})
+            for glyph, digit in zip(glyphs, text):
+                template, count = templates.get(digit, (glyph, 0))
+                if count:
+                    template = (template * count + glyph) / (count + 1)
+                templates[digit] = (template, min(count + 1, MAX_TEMPLATE_SAMPLES))
+
+    def _read_ocr(
+        self, context: Context, image: np.ndarray, node_name: str
+    ) -> Optional[NumberReading]:
+        reco_detail = run_recognition(context, node_name, image)
+        if reco_detail is None or reco_detail.best_result is None:
+            return None
+
+        result = reco_detail.best_result
+        digits = re.sub(r"\D", "", result.text or "")
+        if not digits:
+            logger.debug(f"{node_name} OCR结果不是数字: {result.text}")
+            return None
+        return NumberReading(
+            int(digits), float(getattr(result, "score", 0.0)), list(result.box), "ocr"
+        )
+
+
+digit_reader = DigitReader()
+
+
+def read_number(
+    context: Context,
+    image: np.ndarray,
+    node_name: str,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+) -> Optional[NumberReading]:
+    """使用全局数字读取器读取节点 roi 内的整数"""
+    return digit_reader.read(context, image, node_name, min_confidence)
+
+
+@AgentServer.custom_recognition("ReadNumber")
+class ReadNumber(CustomRecognition):
+    """
+    读取只包含数字的区域。
+
+    参数格式：
+    {
+        "node": string,
+        "expected": int|int[],
+        "min_confidence": float
+    }
+
+    字段说明：
+    - node: OCR 节点名，其 roi 为数字所在区域，置信度不足时回退到该节点的 OCR
+    - expected: 可选，期望的数值，不在其中时识别失败；不填则读到任意整数即成功
+    - min_confidence: 快速路径的最低置信度，默认 0.85
+
+    返回：box 为数字所在区域，detail 为读取到的整数。
+    """
+
+    def analyze(
+        self,
+        context: Context,
+        argv: CustomRecognition.AnalyzeArg,
+    ) -> Union[CustomRecognition.AnalyzeResult, Optional[RectType]]:
+        push_frame(argv.image, argv.node_name)
+        try:
+            params = json.loads(argv.custom_recognition_param)
+            expected = params.get("expected")
+            if expected is not None and not isinstance(expected, list):
+                expected = [expected]
+
+            reading = read_number(
+                context,
+                argv.image,
+                params["node"],
+                params.get("min_confidence", DEFAULT_MIN_CONFIDENCE),
+            )
+            logger.debug(f"ReadNumber({argv.node_name}): {reading}")
+            if reading is None:
+                return None
+            if expected is not None and reading.value not in expected:
+                return None
+
+            return CustomRecognition.AnalyzeResult(
+                box=reading.box, detail=str(reading.value)
+            )
+
+        except Exception as e:
+            logger.error(f"ReadNumber识别失败: {e}")
+            return None
@@ -6,6 +6,37 @@ from maa.custom_recognition import CustomRecognition
 from maa.context import Context
 from maa.define import RectType
 from utils.logger import logger
+from utils.time import get_time_window
+
+from custom.reco.cache import push_frame
+from custom.reco.digits import read_number
+
+
+# 重写账号角色信息 节点中 servername 的占位值，见 2_登录和退出登录相关.json
+SERVERNAME_PLACEHOLDER = "区服名称"
+
+
+class BetCounts:
+    """一轮竞猜中红蓝双方的押注人数读数，读取失败的一方为 None"""
+
+    def __init__(
+        self,
+        red_num: Optional[int] = None,
+        red_box: Optional[RectType] = None,
+        blue_num: Optional[int] = None,
+        blue_box: Optional[RectType] = None,
+    ):
+        self.red_num = red_num
+        self.red_box = red_box
+        self.blue_num = blue_num
+        self.blue_box = blue_box
+
+    @property
+    def complete(self) -> bool:
+        return self.red_num is not None and self.blue_num is not None
+
+    def __repr__(self) -> str:
+        return f"BetCounts(red={self.red_num}, blue={self.blue_num})"
 
 
 @AgentServer.custom_recognition("DuiYiJingCai")
@@ -13,33 +44,49 @@ class DuiYiJingCai(CustomRecognition):
     """
     参数：
     {
-        "zhengya": bool
+        "zhengya": bool,
+        "share": bool,
+        "window_minutes": int
     }
+
+    - zhengya: true 押人数多的一方，false 押人数少的一方，默认 true
+    - share: 是否在同一区服、同一轮竞猜内复用第一次读取的押注人数，默认 true
+      同一区服的所有角色看到的是同一场竞猜，后续角色直接使用缓存结果，不再识别；
+      缓存读数不完整需要重新读取时，押注人数在一轮内只增不减，
+      新读数小于缓存值的一方视为误读，沿用缓存值
+    - window_minutes: 竞猜轮次的时间窗口长度（分钟），从0点起划分，默认 120
     """
 
+    # (区服, 窗口开始时间) -> 押注人数
+    _round_cache: Dict[tuple, BetCounts] = {}
+
     def analyze(
         self,
         context: Context,
         argv: CustomRecognition.AnalyzeArg,
     ) -> Union[CustomRecognition.AnalyzeResult, Optional[RectType]]:
+        push_frame(argv.image, argv.node_name)
         params = json.loads(argv.custom_recognition_param)
         zhengya = params.get("zhengya", True)
+        share = params.get("share", True)
 
-        reco_detail1 = context.run_recognition("J-OCR红方押注人数", argv.image)
-        reco_detail2 = context.run_recognition("J-OCR蓝方押注人数", argv.image)
-        # logger.debug(reco_detail1)
+        round_key = None
+        if share:
+            round_key = self._round_key(context, params.get("window_minutes", 120))
 
-        red_num, red_box, blue_num, blue_box = 0, None, 0, None
-        try:
-            red_num = int(reco_detail1.best_result.text)
-            red_box = reco_detail1.best_result.box
-        except:
-            pass
-        try:
-            blue_num = int(reco_detail2.best_result.text)
-            blue_box = reco_detail2.best_result.box
-        except:
-            pass
+        cached = DuiYiJingCai._round_cache.get(round_key) if round_key else None
+        if cached is not None and cached.complete:
+            logger.debug(f"复用本轮竞猜押注人数: {cached}")
+            counts = cached
+        else:
+            counts = self._read_counts(context, argv.image)
+            if cached is not None:
+                counts = self._check_with_cached(counts, cached)
+            if round_key:
+                DuiYiJingCai._round_cache[round_key] = counts
+
+        red_num, red_box = counts.red_num or 0, counts.red_box
+        blue_num, blue_box = counts.blue_num or 0, counts.blue_box
 
         if zhengya:
             if red_num >= blue_num:
@@ -57,3 +104,55 @@ class DuiYiJingCai(CustomRecognition):
                 rt_box = blue_box
 
         return CustomRecognition.AnalyzeResult(box=rt_box, detail=rt_detail)
+
+    def _read_counts(self, context: Context, image) -> BetCounts:
+        red = read_number(context, image, "J-OCR红方押注人数")
+        blue = read_number(context, image, "J-OCR蓝方押注人数")
+        logger.debug(f"红方: {red}, 蓝方: {blue}")
+
+        counts = BetCounts()
+        if red:
+            counts.red_num, counts.red_box = red.value, red.box
+        if blue:
+            counts.blue_num, counts.blue_box = blue.value, blue.box
+        return counts
+
+    def _check_with_cached(self, fresh: BetCounts, cached: BetCounts) -> BetCounts:
+        """用缓存读数校验新读数：读取失败或比缓存值小的一方沿用缓存值"""
+        result = BetCounts(fresh.red_num, fresh.red_box, fresh.blue_num, fresh.blue_box)
+        if cached.red_num is not None and (
+            fresh.red_num is None or fresh.red_num < cached.red_num
+        ):
+            logger.debug(f"红方读数 {fresh.red_num} 异常，沿用缓存值 {cached.red_num}")
+            result.red_num, result.red_box = cached.red_num, cached.red_box
+        if cached.blue_num is not None and (
+            fresh.blue_num is None or fresh.blue_num < cached.blue_num
+        ):
+            logger.debug(f"蓝方读数 {fresh.blue_num} 异常，沿用缓存值 {cached.blue_num}")
+            result.blue_num, result.blue_box = cached.blue_num, cached.blue_box
+        return result
+
+    @classmethod
+    def _round_key(cls, context: Context, window_minutes: int) -> Optional[tuple]:
+        """当前角色区服和竞猜轮次，获取不到区服或区服仍为占位值时返回 None"""
+        try:
+            node_info = context.get_node_data("重写账号角色信息")
+            servername = node_info["action"]["param"]["custom_action_param"][
+                "servername"
+            ]
+        except (TypeError, KeyError):
+            logger.debug("未获取到当前区服，不复用竞猜结果")
+            return None
+
+        # 没有登录过角色时节点中仍是 pipeline 里的占位文字，无法区分区服
+        if not servername or servername == SERVERNAME_PLACEHOLDER:
+            logger.debug("当前区服未设置，不复用竞猜结果")
+            return None
+
+        window_start, _ = get_time_window(window_minutes)
+
+        # 清理已经结束的轮次
+        for key in [k for k in cls._round_cache if k[1] < window_start]:
+            del cls._round_cache[key]
+
+        return servername, window_start
@@ -0,0 +1,406 @@
+"""
+MultiRecognition 参数编译。
+
+将 custom_recognition_param 中的 logic.expression 和 return 表达式一次性解析为闭包，
+按原始参数字符串做 LRU 缓存，之后每帧只需对节点结果求值，无需再做字符串替换和 eval。
+
+闭包统一接收一个 env 对象，需提供：
+- env.node(index): 返回 $index 节点的识别区域，识别失败返回 None
+- env.external(name): 返回 {name} 外部节点的识别区域，识别失败返回 None
+
+逻辑求值是短路的：env.node 只会在求值确实需要时被调用，AND/OR 的操作数按
+节点开销提示（cost）从低到高排列，因此 env 可以按需执行子节点识别。
+"""
+
+import re
+import json
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(
+    r"\s*(?:(?P<index>\$\d+)|\{(?P<external>[^}]+)\}|(?P<number>[+-]?\s*\d+)"
+    r"|(?P<word>[A-Za-z_]\w*)|(?P<punct>[()\[\],]))"
+)
+
+_LOGIC_KEYWORDS = {
+    "AND": "AND",
+    "OR": "OR",
+    "NOT": "NOT",
+    "TRUE": "TRUE",
+    "FALSE": "FALSE",
+}
+
+EMPTY_ROI = [0, 0, 0, 0]
+
+DEFAULT_NODE_COST = 1
+
+DEFAULT_PARALLEL_TIMEOUT = 5000
+
+
+def _tokenize(expression: str) -> List[tuple]:
+    """将表达式切分为 (类型, 值) 列表"""
+    tokens = []
+    pos = 0
+    expression = expression.rstrip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match:
+            raise ValueError(f"无法解析表达式: {expression}，位置 {pos}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "index":
+            value = int(value[1:])
+        elif kind == "number":
+            # 与 int() 一致，允许正负号，符号与数字之间允许空白
+            value = int(re.sub(r"\s+", "", value))
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """基于 token 列表的递归下降解析器"""
+
+    def __init__(self, expression: str, costs: Optional[List[float]] = None):
+        self.expression = expression
+        self.costs = costs or []
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+        self.indices: Set[int] = set()
+        self.externals: Set[str] = set()
+
+    def peek(self) -> Optional[tuple]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self) -> tuple:
+        token = self.peek()
+        if token is None:
+            raise ValueError(f"表达式意外结束: {self.expression}")
+        self.pos += 1
+        return token
+
+    def expect(self, value: str) -> None:
+        kind, got = self.next()
+        if got != value:
+            raise ValueError(f"表达式 {self.expression} 中期望 '{value}'，得到 '{got}'")
+
+    def finish(self) -> None:
+        if self.peek() is not None:
+            raise ValueError(f"表达式 {self.expression} 存在多余内容: {self.peek()[1]}")
+
+    def keyword(self) -> Optional[str]:
+        token = self.peek()
+        if token is None or token[0] != "word":
+            return None
+        return _LOGIC_KEYWORDS.get(token[1].upper())
+
+    ### 逻辑表达式 ###
+    # 每个解析函数返回 (闭包, 开销)，开销用于对 AND/OR 的操作数排序
+
+    def parse_or(self) -> Tuple[Callable[[Any], bool], float]:
+        operands = [self.parse_and()]
+        while self.keyword() == "OR":
+            self.next()
+            operands.append(self.parse_and())
+        return _short_circuit(operands, any)
+
+    def parse_and(self) -> Tuple[Callable[[Any], bool], float]:
+        operands = [self.parse_not()]
+        while self.keyword() == "AND":
+            self.next()
+            operands.append(self.parse_not())
+        return _short_circuit(operands, all)
+
+    def parse_not(self) -> Tuple[Callable[[Any], bool], float]:
+        if self.keyword() == "NOT":
+            self.next()
+            operand, cost = self.parse_not()
+            return (lambda env: not operand(env)), cost
+        return self.parse_logic_atom()
+
+    def parse_logic_atom(self) -> Tuple[Callable[[Any], bool], float]:
+        keyword = self.keyword()
+        kind, value = self.next()
+        if kind == "index":
+            self.indices.add(value)
+            cost = self.costs[value] if value < len(self.costs) else DEFAULT_NODE_COST
+            return (lambda env: env.node(value) is not None), cost
+        if kind == "external":
+            self.externals.add(value)
+            return (lambda env: env.external(value) is not None), 0
+        if keyword == "TRUE":
+            return (lambda env: True), 0
+        if keyword == "FALSE":
+            return (lambda env: False), 0
+        if value == "(":
+            inner = self.parse_or()
+            self.expect(")")
+            return inner
+        raise ValueError(f"表达式 {self.expression} 中存在无效内容: {value}")
+
+    ### ROI表达式 ###
+
+    def parse_roi(self) -> Callable[[Any], Optional[List[int]]]:
+        kind, value = self.next()
+        if kind == "index":
+            self.indices.add(value)
+            return lambda env: env.node(value) or EMPTY_ROI
+        if kind == "external":
+            self.externals.add(value)
+            return lambda env: env.external(value) or EMPTY_ROI
+        if value == "[":
+            coords = []
+            for i in range(4):
+                if i:
+                    self.expect(",")
+                coords.append(self.parse_int())
+            self.expect("]")
+            return lambda env: list(coords)
+        if kind == "word":
+            return self.parse_roi_function(value)
+        raise ValueError(f"ROI表达式 {self.expression} 中存在无效内容: {value}")
+
+    def parse_int(self) -> int:
+        kind, value = self.next()
+        if kind != "number":
+            raise ValueError(f"ROI表达式 {self.expression} 中期望整数，得到 '{value}'")
+        return value
+
+    def parse_roi_function(self, func_name: str) -> Callable[[Any], Optional[List[int]]]:
+        self.expect("(")
+        if func_name in ("UNION", "INTERSECTION"):
+            roi1 = self.parse_roi()
+            self.expect(",")
+            roi2 = self.parse_roi()
+            self.expect(")")
+            func = roi_union if func_name == "UNION" else roi_intersection
+            return lambda env: func(roi1(env), roi2(env))
+
+        if func_name == "OFFSET":
+            roi = self.parse_roi()
+            deltas = []
+            for _ in range(4):
+                self.expect(",")
+                deltas.append(self.parse_int())
+            self.expect(")")
+            return lambda env: roi_offset(roi(env), *deltas)
+
+        raise ValueError(f"不支持的ROI函数: {func_name}")
+
+
+def _short_circuit(
+    operands: List[Tuple[Callable[[Any], bool], float]],
+    reducer: Callable,
+) -> Tuple[Callable[[Any], bool], float]:
+    """组合 AND/OR 操作数，开销低的先求值，any/all 负责短路"""
+    if len(operands) == 1:
+        return operands[0]
+    ordered = [f for f, _ in sorted(operands, key=lambda item: item[1])]
+    cost = sum(c for _, c in operands)
+    return (lambda env: reducer(f(env) for f in ordered)), cost
+
+
+def _parse_nodes(nodes: Any) -> Tuple[List[str], List[float]]:
+    """解析 nodes 字段，元素可以是节点名，或 {"name": 节点名, "cost": 开销}"""
+    if not isinstance(nodes, list):
+        raise ValueError(f"nodes字段格式错误: {nodes}")
+
+    names, costs = [], []
+    for node in nodes:
+        if isinstance(node, str):
+            names.append(node)
+            costs.append(DEFAULT_NODE_COST)
+        elif isinstance(node, dict) and isinstance(node.get("name"), str):
+            cost = node.get("cost", DEFAULT_NODE_COST)
+            if not isinstance(cost, (int, float)) or isinstance(cost, bool):
+                raise ValueError(f"节点 {node['name']} 的cost格式错误: {cost}")
+            names.append(node["name"])
+            costs.append(cost)
+        else:
+            raise ValueError(f"nodes元素格式错误: {node}")
+    return names, costs
+
+
+class CompiledParams:
+    """
+    编译后的 MultiRecognition 参数
+
+    属性：
+    - nodes: 节点名称列表，对应 $0、$1、$2...
+    - costs: 节点开销提示，与 nodes 一一对应
+    - logic: env -> bool，逻辑判断
+    - roi: env -> Optional[int[4]]，ROI计算（未裁剪）
+    - fixed_roi: return 为固定坐标时为 True，结果无需裁剪
+    - externals: 表达式中引用的 {NodeName} 集合
+    - parallel: 是否并行识别全部子节点
+    - timeout: 并行识别的整体超时（毫秒）
+    """
+
+    def __init__(
+        self,
+        nodes: List[str],
+        costs: List[float],
+        logic: Callable[[Any], bool],
+        roi: Callable[[Any], Optional[List[int]]],
+        fixed_roi: bool,
+        externals: Set[str],
+        parallel: bool = False,
+        timeout: int = DEFAULT_PARALLEL_TIMEOUT,
+    ):
+        self.nodes = nodes
+        self.costs = costs
+        self.logic = logic
+        self.roi = roi
+        self.fixed_roi = fixed_roi
+        self.externals = externals
+        self.parallel = parallel
+        self.timeout = timeout
+
+
+def _compile_logic(logic: Any, costs: List[float], externals: Set[str]) -> Callable:
+    if not isinstance(logic, dict):
+        raise ValueError(f"logic字段格式错误: {logic}")
+
+    logic_type = logic.get("type", "AND")
+    node_count = len(costs)
+    # 按开销升序，开销相同时保持原顺序
+    indices = sorted(range(node_count), key=lambda i: costs[i])
+
+    if logic_type == "AND":
+        return lambda env: all(env.node(i) is not None for i in indices)
+
+    if logic_type == "OR":
+        return lambda env: any(env.node(i) is not None for i in indices)
+
+    if logic_type == "CUSTOM":
+        expression = logic.get("expression", "")
+        if expression == "":
+            raise ValueError("未提供expression")
+        parser = _Parser(expression, costs)
+        compiled, _ = parser.parse_or()
+        parser.finish()
+        _check_indices(parser.indices, node_count, expression)
+        externals.update(parser.externals)
+        return compiled
+
+    raise ValueError(f"不支持的logic类型: {logic_type}")
+
+
+def _compile_return(
+    return_value: Any, node_count: int, externals: Set[str]
+) -> Callable:
+    if isinstance(return_value, list) and len(return_value) == 4:
+        try:
+            coords = [int(x) for x in return_value]
+        except (ValueError, TypeError):
+            raise ValueError(f"return坐标格式错误: {return_value}")
+        return lambda env: list(coords)
+
+    if isinstance(return_value, str):
+        parser = _Parser(return_value.strip())
+        compiled = parser.parse_roi()
+        parser.finish()
+        _check_indices(parser.indices, node_count, return_value)
+        externals.update(parser.externals)
+        return compiled
+
+    raise ValueError(f"return值类型错误，应为int[4]或string: {return_value}")
+
+
+def _check_indices(indices: Set[int], node_count: int, expression: str) -> None:
+    invalid = sorted(i for i in indices if i >= node_count)
+    if invalid:
+        raise ValueError(f"表达式 {expression} 引用了不存在的节点: {invalid}")
+
+
+@lru_cache(maxsize=128)
+def compile_params(raw_param: str) -> CompiledParams:
+    """
+    解析并编译 MultiRecognition 参数，结果按原始参数字符串缓存
+
+    参数错误时抛出 ValueError
+    """
+    params = json.loads(raw_param)
+    nodes, costs = _parse_nodes(params.get("nodes", []))
+    logic = params.get("logic", {"type": "AND"})
+    return_value = params.get("return", None)
+
+    if not nodes:
+        raise ValueError("nodes字段不能为空或空数组")
+
+    if return_value is None or return_value == "":
+        raise ValueError("return字段不能为空")
+
+    externals: Set[str] = set()
+    compiled_logic = _compile_logic(logic, costs, externals)
+    compiled_roi = _compile_return(return_value, len(nodes), externals)
+
+    parallel = params.get("parallel", False)
+    timeout = params.get("timeout", DEFAULT_PARALLEL_TIMEOUT)
+    if not isinstance(parallel, bool):
+        raise ValueError(f"parallel字段应为bool: {parallel}")
+    if not isinstance(timeout, int) or isinstance(timeout, bool) or timeout <= 0:
+        raise ValueError(f"无效的timeout值: {timeout}")
+
+    return CompiledParams(
+        nodes=nodes,
+        costs=costs,
+        logic=compiled_logic,
+        roi=compiled_roi,
+        fixed_roi=isinstance(return_value, list),
+        externals=externals,
+        parallel=parallel,
+        timeout=timeout,
+    )
+
+
+### ROI 计算 ###
+
+
+def roi_union(roi1: List[int], roi2: List[int]) -> List[int]:
+    """
+    计算两个ROI的并集
+    """
+    x1, y1, w1, h1 = roi1
+    x2, y2, w2, h2 = roi2
+
+    if w1 == 0 and h1 == 0:
+        return roi2
+    elif w2 == 0 and h2 == 0:
+        return roi1
+
+    # 计算边界
+    left = min(x1, x2)
+    top = min(y1, y2)
+    right = max(x1 + w1, x2 + w2)
+    bottom = max(y1 + h1, y2 + h2)
+
+    return [left, top, right - left, bottom - top]
+
+
+def roi_intersection(roi1: List[int], roi2: List[int]) -> List[int]:
+    """
+    计算两个ROI的交集
+    """
+    x1, y1, w1, h1 = roi1
+    x2, y2, w2, h2 = roi2
+
+    # 计算交集边界
+    left = max(x1, x2)
+    top = max(y1, y2)
+    right = min(x1 + w1, x2 + w2)
+    bottom = min(y1 + h1, y2 + h2)
+
+    # 检查是否有交集
+    if left >= right or top >= bottom:
+        return [0, 0, 0, 0]
+
+    return [left, top, right - left, bottom - top]
+
+
+def roi_offset(roi: List[int], dx: int, dy: int, dw: int, dh: int) -> List[int]:
+    """
+    计算ROI偏移
+    """
+    x, y, w, h = roi
+    return [x + dx, y + dy, w + dw, h + dh]
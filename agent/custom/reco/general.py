@@ -1,7 +1,9 @@
-import re
 import sys
 import json
-import random
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Any, Dict, List, Union, Optional
 
 from maa.agent.agent_server import AgentServer
@@ -10,6 +12,99 @@ from maa.context import Context
 from maa.define import RectType
 from utils.logger import logger
 
+from custom.reco.cache import push_frame, run_recognition
+from custom.reco.expression import CompiledParams, compile_params, roi_intersection
+
+# 并行识别子节点的线程池上限，所有 MultiRecognition 共享
+PARALLEL_MAX_WORKERS = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=PARALLEL_MAX_WORKERS,
+                thread_name_prefix="MultiRecognition",
+            )
+        return _executor
+
+
+class TaskNodeIndex:
+    """
+    任务内节点识别结果索引：节点名 -> 该节点最近一次的识别区域
+
+    按 task_id 保存并跨 analyze 复用。更新时只读取任务的节点号列表
+    （TaskDetail.node_id_list，不含节点详情），再对上次之后新增的节点号调用
+    tasker.get_node_detail()，开销与新增节点数成正比，不随任务运行时长变慢；
+    查询为字典查找。
+
+    旧版绑定的 TaskDetail 没有 node_id_list，此时退回到读取全部节点详情（O(N)）。
+    """
+
+    # 保留最近几个任务的索引，旧任务的索引自动淘汰
+    MAX_TASKS = 8
+
+    _indexes: "OrderedDict[int, TaskNodeIndex]" = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, task_id: int):
+        self.task_id = task_id
+        self._consumed = 0
+        self._boxes: Dict[str, Optional[RectType]] = {}
+
+    @classmethod
+    def get(cls, task_id: int) -> "TaskNodeIndex":
+        with cls._lock:
+            index = cls._indexes.get(task_id)
+            if index is None:
+                index = cls(task_id)
+                cls._indexes[task_id] = index
+                while len(cls._indexes) > cls.MAX_TASKS:
+                    cls._indexes.popitem(last=False)
+            else:
+                cls._indexes.move_to_end(task_id)
+            return index
+
+    def update(self, tasker) -> None:
+        """只获取上次更新之后新增节点的详情并加入索引"""
+        task_detail = tasker.get_task_detail(self.task_id)
+        if not task_detail:
+            return
+
+        node_ids = getattr(task_detail, "node_id_list", None)
+        if node_ids is None:
+            node_ids = task_detail.nodes or []
+            get_detail = lambda node_detail: node_detail
+        else:
+            get_detail = tasker.get_node_detail
+
+        if len(node_ids) < self._consumed:
+            # 节点记录变少说明任务详情已不是同一份，重新建立索引
+            self._consumed = 0
+            self._boxes.clear()
+
+        for node_id in node_ids[self._consumed :]:
+            node_detail = get_detail(node_id)
+            if node_detail is None:
+                continue
+            recognition = node_detail.recognition
+            self._boxes[node_detail.name] = (
+                recognition.box
+                if recognition is not None and recognition.box is not None
+                else None
+            )
+        self._consumed = len(node_ids)
+
+    def contains(self, node_name: str) -> bool:
+        return node_name in self._boxes
+
+    def get_box(self, node_name: str) -> Optional[RectType]:
+        return self._boxes.get(node_name)
+
 
 @AgentServer.custom_recognition("MultiRecognition")
 class MultiRecognition(CustomRecognition):
@@ -18,16 +113,21 @@ class MultiRecognition(CustomRecognition):
 
     参数格式：
     {
-        "nodes": string[],
+        "nodes": (string|{"name": string, "cost": number})[],
         "logic": {
             "type": "AND|OR|CUSTOM",
             "expression": string
         },
-        "return": string|int[4]|None
+        "return": string|int[4]|None,
+        "parallel": bool,
+        "timeout": int
     }
 
     字段说明：
     - nodes: 节点名称数组，按顺序对应 $0、$1、$2...
+      - 元素也可以写成 {"name": 节点名, "cost": 开销}，cost 默认为 1
+      - 子节点按需识别：AND 遇到失败、OR 遇到成功即停止，CUSTOM 只识别求值用到的节点
+      - 同一层的 AND/OR 条件按 cost 从低到高求值，开销低的检查先执行
     - logic: 逻辑判断条件
       - type: 逻辑类型，默认"AND"
         - "AND": 所有节点都识别成功
@@ -46,64 +146,38 @@ class MultiRecognition(CustomRecognition):
         - 支持 INTERSECTION($0,$1): 计算交集
         - 支持 OFFSET($0,dx,dy,dw,dh): 偏移调整
         - 支持嵌套计算
+    - parallel: 是否并行识别，默认 false
+      - 为 true 时所有子节点同时提交到共享线程池识别，适合多个 OCR 等耗时节点
+      - 此时不做短路求值，cost 仅影响提交顺序
+      - 并行模式会从多个线程同时调用 context.run_recognition，仅在确认框架侧可并发识别时使用
+    - timeout: 并行识别的整体超时（毫秒），默认 5000，超时未完成的节点视为识别失败；
+      尚未开始的识别会被取消，已经开始的识别无法中断，返回前仍会等待其结束
+
+    参数在首次使用时编译为闭包并按原始参数字符串缓存，见 expression.py。
+    每次 analyze 的状态保存在独立的 _Evaluation 中，识别器本身不保存状态。
     """
 
-    def __init__(self):
-        super().__init__()
-        self._context: Optional[Context] = None
-        self._argv: Optional[CustomRecognition.AnalyzeArg] = None
-        self._external_node_cache: Optional[Dict[str, bool]] = None
-        self._external_roi_cache: Optional[Dict[str, Optional[RectType]]] = None
-
     def analyze(
         self,
         context: Context,
         argv: CustomRecognition.AnalyzeArg,
     ) -> Union[CustomRecognition.AnalyzeResult, Optional[RectType]]:
+        push_frame(argv.image, argv.node_name)
         try:
-            self._context = context
-            self._argv = argv
-            # 初始化缓存
-            self._external_node_cache = {}
-            self._external_roi_cache = {}
-
-            params = json.loads(argv.custom_recognition_param)
-            nodes = params.get("nodes", [])
-            logic = params.get("logic", {"type": "AND"})
-            return_value = params.get("return", None)
-
-            if not nodes:
-                logger.error("nodes字段不能为空或空数组")
-                return None
-
-            if return_value is None or return_value == "":
-                logger.error("return字段不能为空")
-                return None
-
-            # 执行每个节点的识别
-            node_results = {}
-            for i, node_name in enumerate(nodes):
-                index_key = f"${i}"
-
-                reco_detail = context.run_recognition(node_name, argv.image)
-                logger.debug(
-                    f"{node_name}({index_key}): {reco_detail.box if (reco_detail is not None) else None}"
-                )
+            compiled = compile_params(argv.custom_recognition_param)
+            # 子节点在求值时按需识别，见 _Evaluation.node()
+            evaluation = _Evaluation(context, argv, compiled)
 
-                if reco_detail is not None and reco_detail.box is not None:
-                    # 标准化ROI，将[0,0,0,0]转换为实际全屏坐标，其它不变
-                    normalized_roi = self._normalize_roi(list(reco_detail.box))
-                    node_results[index_key] = normalized_roi
-                else:
-                    node_results[index_key] = None
+            if compiled.parallel:
+                evaluation.run_nodes_parallel()
 
             # 逻辑判断
-            if not self._check_logic_condition(logic, node_results):
+            if not compiled.logic(evaluation):
                 logger.debug("逻辑条件不满足，识别失败")
                 return None
 
             # ROI计算
-            final_roi = self._process_return_value(return_value, node_results)
+            final_roi = evaluation.calculate_roi()
             if final_roi:
                 logger.debug(f"MultiRecognition识别成功，返回ROI: {final_roi}")
                 return CustomRecognition.AnalyzeResult(
@@ -117,441 +191,151 @@ class MultiRecognition(CustomRecognition):
             logger.error(f"MultiRecognition执行出错: {e}")
             return None
 
-        finally:
-            self._context = None
-            self._argv = None
-            self._external_node_cache = None
-            self._external_roi_cache = None
-
-    def _ensure_external_nodes_cached(self, node_names: List[str]) -> None:
-        """
-        确保指定的外部节点信息已缓存
-        """
-        # 确保缓存已初始化
-        if self._external_node_cache is None:
-            self._external_node_cache = {}
-        if self._external_roi_cache is None:
-            self._external_roi_cache = {}
-
-        # 找出还未缓存的节点
-        uncached_nodes = [
-            name for name in node_names if name not in self._external_node_cache
-        ]
-
-        if not uncached_nodes:
-            return  # 所有节点都已缓存
-
-        logger.debug(f"缓存外部节点: {uncached_nodes}")
-
-        task_id = self._argv.task_detail.task_id
-        task_detail = self._context.tasker.get_task_detail(task_id)
-
-        if task_detail and task_detail.nodes:
-            for node_detail in reversed(task_detail.nodes):
-                if node_detail.name in uncached_nodes:
-                    # 缓存识别结果
-                    recognition_success = (
-                        node_detail.recognition is not None
-                        and node_detail.recognition.box is not None
-                    )
-                    self._external_node_cache[node_detail.name] = recognition_success
-
-                    # 缓存ROI
-                    if recognition_success:
-                        # 标准化外部节点的ROI
-                        external_roi = self._normalize_roi(
-                            list(node_detail.recognition.box)
-                        )
-                        self._external_roi_cache[node_detail.name] = external_roi
-                    else:
-                        self._external_roi_cache[node_detail.name] = None
-
-                    logger.debug(
-                        f"缓存外部节点 {node_detail.name}: 成功={recognition_success}, "
-                        f"ROI={self._external_roi_cache[node_detail.name]}"
-                    )
-                    uncached_nodes.remove(node_detail.name)
 
-        # 对于未找到的节点，标记为失败
-        for remaining_node in uncached_nodes:
-            logger.warning(f"外部节点 {remaining_node} 未找到")
-            self._external_node_cache[remaining_node] = False
-            self._external_roi_cache[remaining_node] = None
+class _Evaluation:
+    """
+    一次 MultiRecognition.analyze 的求值环境，提供表达式需要的 node() 和 external()
+    """
 
-    def _check_logic_condition(
+    def __init__(
         self,
-        logic: Dict[str, Any],
-        node_results: Dict[str, Optional[RectType]],
-    ) -> bool:
-        """检查逻辑条件是否满足"""
-        logic_type = logic.get("type", "AND")
-
-        if logic_type == "AND":
-            for key, result in node_results.items():
-                if result is None:
-                    return False
-            return True
-
-        elif logic_type == "OR":
-            for key, result in node_results.items():
-                if result is not None:
-                    return True
-            return False
-
-        elif logic_type == "CUSTOM":
-            expression = logic.get("expression", "")
-            if expression == "":
-                logger.error("未提供expression")
-                return False
-
-            return self._evaluate_logic_expression(expression, node_results)
-
+        context: Context,
+        argv: CustomRecognition.AnalyzeArg,
+        compiled: CompiledParams,
+    ):
+        self.context = context
+        self.argv = argv
+        self.compiled = compiled
+        self.node_results: Dict[int, Optional[RectType]] = {}
+        self.external_roi_cache: Dict[str, Optional[RectType]] = {}
+
+    def node(self, index: int) -> Optional[RectType]:
+        """表达式求值接口：$index 节点的识别区域，首次访问时执行识别"""
+        if index not in self.node_results:
+            node_name = self.compiled.nodes[index]
+            reco_detail = run_recognition(self.context, node_name, self.argv.image)
+            self._store_node_result(index, reco_detail)
+
+        return self.node_results[index]
+
+    def _store_node_result(self, index: int, reco_detail) -> None:
+        """记录 $index 节点的识别结果"""
+        logger.debug(
+            f"{self.compiled.nodes[index]}(${index}): {reco_detail.box if (reco_detail is not None) else None}"
+        )
+
+        if reco_detail is not None and reco_detail.box is not None:
+            # 标准化ROI，将[0,0,0,0]转换为实际全屏坐标，其它不变
+            self.node_results[index] = self._normalize_roi(list(reco_detail.box))
         else:
-            logger.error(f"不支持的logic类型: {logic_type}")
-            return False
-
-    def _evaluate_logic_expression(
-        self,
-        expression: str,
-        node_results: Dict[str, Optional[RectType]],
-    ) -> bool:
-        """计算逻辑表达式"""
-        try:
-            eval_expression = expression
-
-            # 处理 {NodeName} 引用其他已执行节点
-            if "{" in eval_expression:
-                external_node_names = list(
-                    set(re.findall(r"\{([^}]+)\}", eval_expression))
-                )
-
-                if external_node_names:
-                    # 确保外部节点信息已缓存
-                    self._ensure_external_nodes_cached(external_node_names)
-
-                    # 替换外部节点引用
-                    for node_name in external_node_names:
-                        recognition_success = self._external_node_cache.get(
-                            node_name, False
-                        )
-                        bool_value = "True" if recognition_success else "False"
-                        eval_expression = eval_expression.replace(
-                            f"{{{node_name}}}", bool_value
-                        )
-                        logger.debug(f"外部节点 {node_name}: {bool_value}")
-
-            # 替换 $0、$1、$2... 为对应的识别结果
-            for key, result in node_results.items():
-                bool_value = "True" if result is not None else "False"
-                eval_expression = eval_expression.replace(key, bool_value)
+            self.node_results[index] = None
 
-            eval_expression = eval_expression.replace("AND", "and")
-            eval_expression = eval_expression.replace("OR", "or")
-            eval_expression = eval_expression.replace("NOT", "not")
-
-            logger.debug(f"表达式转换: {expression} -> {eval_expression}")
-
-            # 计算表达式
-            result = eval(eval_expression)
-
-            return bool(result)
-
-        except Exception as e:
-            logger.error(f"逻辑表达式计算失败: {expression}, 错误: {e}")
-            return False
-
-    def _process_return_value(
-        self,
-        return_value: Union[str, List[int]],
-        node_results: Dict[str, Optional[RectType]],
-    ) -> Optional[RectType]:
-        """
-        处理return值，支持直接坐标和表达式计算
+    def run_nodes_parallel(self) -> None:
         """
-        try:
-            if isinstance(return_value, list) and len(return_value) == 4:
-                # 直接返回坐标数组 [x, y, w, h]
-                try:
-                    result = [int(x) for x in return_value]
-                    logger.debug(f"返回固定坐标: {result}")
-                    return result
-                except (ValueError, TypeError):
-                    logger.error(f"return坐标格式错误: {return_value}")
-                    return None
-
-            elif isinstance(return_value, str):
-                # 计算ROI表达式
-                return self._calculate_roi_expression(return_value, node_results)
+        将所有子节点提交到线程池并行识别，共享同一帧图像，在超时内收集结果
 
-            else:
-                logger.error(f"return值类型错误，应为int[4]或string: {return_value}")
-                return None
-
-        except Exception as e:
-            logger.error(f"处理return值失败: {return_value}, 错误: {e}")
-            return None
-
-    def _calculate_roi_expression(
-        self,
-        expression: str,
-        node_results: Dict[str, Optional[RectType]],
-    ) -> Optional[RectType]:
-        """
-        计算ROI表达式
+        超时后取消尚未开始的识别，并等待已经开始的识别结束后再返回，
+        保证 analyze 返回后不再有线程使用 context，线程池也不会被占用。
         """
-        try:
-            eval_expression = expression.strip()
-
-            # 处理 {NodeName} 引用其他已执行节点的ROI
-            if "{" in eval_expression:
-                eval_expression = self._replace_external_node_rois(eval_expression)
-                # 检查是否有无效ROI
-                if eval_expression is None:
-                    logger.warning("外部节点ROI引用失败，ROI计算失败")
-                    return None
+        compiled = self.compiled
+        executor = _get_executor()
+        order = sorted(range(len(compiled.nodes)), key=lambda i: compiled.costs[i])
+        futures = {
+            executor.submit(
+                run_recognition, self.context, compiled.nodes[i], self.argv.image
+            ): i
+            for i in order
+        }
+
+        done, not_done = wait(futures, timeout=compiled.timeout / 1000)
+        if not_done:
+            for future in not_done:
+                future.cancel()
+            wait(not_done)
+
+        for future, index in futures.items():
+            node_name = compiled.nodes[index]
+            if future in not_done:
+                logger.warning(f"{node_name}(${index}) 并行识别超时，视为识别失败")
+                self.node_results[index] = None
+                continue
+
+            try:
+                reco_detail = future.result()
+            except Exception as e:
+                logger.error(f"{node_name}(${index}) 并行识别出错: {e}")
+                reco_detail = None
+
+            self._store_node_result(index, reco_detail)
+
+    def external(self, name: str) -> Optional[RectType]:
+        """表达式求值接口：{name} 外部节点的识别区域"""
+        if name not in self.external_roi_cache:
+            # 首次访问时一并缓存表达式中引用的所有外部节点
+            self._ensure_external_nodes_cached(list(self.compiled.externals))
+        return self.external_roi_cache.get(name)
 
-            # 替换 $0, $1, $2... 为对应的ROI坐标
-            for key, roi in node_results.items():
-                if roi is not None:
-                    roi_str = f"[{roi[0]},{roi[1]},{roi[2]},{roi[3]}]"
-                    eval_expression = eval_expression.replace(key, roi_str)
-                else:
-                    eval_expression = eval_expression.replace(key, "[0,0,0,0]")
-
-            logger.debug(f"ROI表达式转换: {expression} -> {eval_expression}")
-
-            # 处理函数调用：UNION, INTERSECTION, OFFSET
-            result = self._evaluate_roi_functions(eval_expression)
-
-            if result and len(result) == 4:
-                final_roi = [int(x) for x in result]
-
-                # 统一边界处理：与全屏ROI取交集
-                screen_roi = self._normalize_roi([0, 0, 0, 0])
-                clipped_roi = self._calculate_intersection(final_roi, screen_roi)
-
-                if clipped_roi == [0, 0, 0, 0]:
-                    logger.warning(f"ROI计算结果完全超出屏幕范围: {final_roi}")
-                    return None
-
-                if clipped_roi != final_roi:
-                    logger.debug(f"ROI结果裁剪: {final_roi} -> {clipped_roi}")
-
-                return clipped_roi
-            else:
-                logger.error(f"ROI计算结果无效: {result}")
-                return None
-
-        except Exception as e:
-            logger.error(f"ROI表达式计算失败: {expression}, 错误: {e}")
-            return None
-
-    def _replace_external_node_rois(self, expression: str) -> Optional[str]:
+    def _ensure_external_nodes_cached(self, node_names: List[str]) -> None:
         """
-        替换表达式中的 {NodeName} 为对应的ROI坐标
+        确保指定的外部节点信息已缓存
         """
-        external_node_names = re.findall(r"\{([^}]+)\}", expression)
-
-        if external_node_names:
-            # 确保外部节点信息已缓存
-            self._ensure_external_nodes_cached(external_node_names)
-
-            # 替换外部节点ROI引用
-            for node_name in external_node_names:
-                roi = self._external_roi_cache.get(node_name)
-
-                if roi is not None:
-                    roi_str = f"[{roi[0]},{roi[1]},{roi[2]},{roi[3]}]"
-                    expression = expression.replace(f"{{{node_name}}}", roi_str)
-                    logger.debug(f"{node_name} ROI: {roi_str}")
-                else:
-                    expression = expression.replace(f"{{{node_name}}}", "[0,0,0,0]")
-                    logger.debug("{node_name} ROI: " + "[0,0,0,0]")
-
-        return expression
+        # 找出还未缓存的节点
+        uncached_nodes = [
+            name for name in node_names if name not in self.external_roi_cache
+        ]
 
-    def _evaluate_roi_functions(self, expression: str) -> Optional[List[int]]:
-        """
-        计算ROI函数表达式
-        """
+        if not uncached_nodes:
+            return  # 所有节点都已缓存
 
-        # 处理嵌套函数调用，从内向外
-        while True:
-            # 查找最内层的函数调用
-            match = re.search(r"(\w+)\(([^()]*)\)", expression)
-            if not match:
-                break
+        logger.debug(f"缓存外部节点: {uncached_nodes}")
 
-            func_name = match.group(1)
-            func_args = match.group(2)
-            full_match = match.group(0)
+        index = TaskNodeIndex.get(self.argv.task_detail.task_id)
+        index.update(self.context.tasker)
 
-            # 计算函数结果
-            func_result = self._execute_roi_function(func_name, func_args)
-            if func_result is None:
-                return None
+        for node_name in uncached_nodes:
+            if not index.contains(node_name):
+                logger.warning(f"外部节点 {node_name} 未找到")
+                self.external_roi_cache[node_name] = None
+                continue
 
-            # 替换函数调用为结果
-            result_str = (
-                f"[{func_result[0]},{func_result[1]},{func_result[2]},{func_result[3]}]"
+            box = index.get_box(node_name)
+            # 标准化外部节点的ROI，识别失败记为None
+            self.external_roi_cache[node_name] = (
+                self._normalize_roi(list(box)) if box is not None else None
+            )
+            logger.debug(
+                f"缓存外部节点 {node_name}: 成功={box is not None}, "
+                f"ROI={self.external_roi_cache[node_name]}"
             )
-            expression = expression.replace(full_match, result_str, 1)
-
-        # 最终表达式应该是一个ROI数组
-        try:
-            if expression.startswith("[") and expression.endswith("]"):
-                # 解析 [x,y,w,h] 格式
-                coords = expression[1:-1].split(",")
-                return [int(x.strip()) for x in coords]
-            else:
-                logger.error(f"无法解析最终ROI表达式: {expression}")
-                return None
-        except Exception as e:
-            logger.error(f"解析最终ROI失败: {expression}, 错误: {e}")
-            return None
-
-    def _execute_roi_function(
-        self, func_name: str, func_args: str
-    ) -> Optional[List[int]]:
-        """
-        执行具体的ROI函数
-        """
-        try:
-            args = self._parse_function_args(func_args)
-
-            if func_name == "UNION":
-                if len(args) != 2:
-                    logger.error(f"UNION函数需要2个参数，得到{len(args)}个: {args}")
-                    return None
-                roi1 = self._parse_roi_arg(args[0])
-                roi2 = self._parse_roi_arg(args[1])
-                if roi1 and roi2:
-                    return self._calculate_union(roi1, roi2)
-
-            elif func_name == "INTERSECTION":
-                if len(args) != 2:
-                    logger.error(
-                        f"INTERSECTION函数需要2个参数，得到{len(args)}个: {args}"
-                    )
-                    return None
-                roi1 = self._parse_roi_arg(args[0])
-                roi2 = self._parse_roi_arg(args[1])
-                if roi1 and roi2:
-                    return self._calculate_intersection(roi1, roi2)
-
-            elif func_name == "OFFSET":
-                if len(args) != 5:
-                    logger.error(f"OFFSET函数需要5个参数，得到{len(args)}个: {args}")
-                    return None
-                roi = self._parse_roi_arg(args[0])
-                if roi:
-                    dx, dy, dw, dh = [int(x) for x in args[1:5]]
-                    return self._calculate_offset(roi, dx, dy, dw, dh)
-
-            else:
-                logger.error(f"不支持的ROI函数: {func_name}")
-                return None
-
-        except Exception as e:
-            logger.error(f"执行ROI函数失败: {func_name}({func_args}), 错误: {e}")
-            return None
 
-    def _parse_roi_arg(self, arg: str) -> Optional[List[int]]:
+    def calculate_roi(self) -> Optional[RectType]:
         """
-        解析ROI参数 [x,y,w,h]
+        计算return对应的ROI，表达式结果统一与全屏ROI取交集
         """
-        try:
-            if arg.startswith("[") and arg.endswith("]"):
-                coords = arg[1:-1].split(",")
-                roi = [int(x.strip()) for x in coords]
-                return roi
-            else:
-                logger.error(f"无效的ROI参数格式: {arg}")
-                return None
-        except Exception as e:
-            logger.error(f"解析ROI参数失败: {arg}, 错误: {e}")
+        compiled = self.compiled
+        result = compiled.roi(self)
+        if compiled.fixed_roi:
+            logger.debug(f"返回固定坐标: {result}")
+            return result
+
+        if not result or len(result) != 4:
+            logger.error(f"ROI计算结果无效: {result}")
             return None
 
-    def _parse_function_args(self, args_str: str) -> List[str]:
-        """
-        智能解析函数参数，正确处理包含方括号的ROI参数
-        """
-        args = []
-        current_arg = ""
-        bracket_count = 0
-
-        for char in args_str:
-            if char == "[":
-                bracket_count += 1
-                current_arg += char
-            elif char == "]":
-                bracket_count -= 1
-                current_arg += char
-            elif char == "," and bracket_count == 0:
-                # 只有在方括号外的逗号才作为参数分隔符
-                args.append(current_arg.strip())
-                current_arg = ""
-            else:
-                current_arg += char
-
-        # 添加最后一个参数
-        if current_arg:
-            args.append(current_arg.strip())
-
-        return args
-
-    def _calculate_union(self, roi1: List[int], roi2: List[int]) -> List[int]:
-        """
-        计算两个ROI的并集
-        """
-        x1, y1, w1, h1 = roi1
-        x2, y2, w2, h2 = roi2
-
-        if w1 == 0 and h1 == 0:
-            return roi2
-        elif w2 == 0 and h2 == 0:
-            return roi1
-
-        # 计算边界
-        left = min(x1, x2)
-        top = min(y1, y2)
-        right = max(x1 + w1, x2 + w2)
-        bottom = max(y1 + h1, y2 + h2)
+        final_roi = [int(x) for x in result]
 
-        return [left, top, right - left, bottom - top]
+        # 统一边界处理：与全屏ROI取交集
+        screen_roi = self._normalize_roi([0, 0, 0, 0])
+        clipped_roi = roi_intersection(final_roi, screen_roi)
 
-    def _calculate_intersection(self, roi1: List[int], roi2: List[int]) -> List[int]:
-        """
-        计算两个ROI的交集
-        """
-        x1, y1, w1, h1 = roi1
-        x2, y2, w2, h2 = roi2
-
-        # 计算交集边界
-        left = max(x1, x2)
-        top = max(y1, y2)
-        right = min(x1 + w1, x2 + w2)
-        bottom = min(y1 + h1, y2 + h2)
+        if clipped_roi == [0, 0, 0, 0]:
+            logger.warning(f"ROI计算结果完全超出屏幕范围: {final_roi}")
+            return None
 
-        # 检查是否有交集
-        if left >= right or top >= bottom:
-            return [0, 0, 0, 0]
+        if clipped_roi != final_roi:
+            logger.debug(f"ROI结果裁剪: {final_roi} -> {clipped_roi}")
 
-        return [left, top, right - left, bottom - top]
-
-    def _calculate_offset(
-        self, roi: List[int], dx: int, dy: int, dw: int, dh: int
-    ) -> List[int]:
-        """
-        计算ROI偏移
-        """
-        x, y, w, h = roi
-        new_x = x + dx
-        new_y = y + dy
-        new_w = w + dw
-        new_h = h + dh
-
-        return [new_x, new_y, new_w, new_h]
+        return clipped_roi
 
     def _normalize_roi(self, roi: List[int]) -> List[int]:
         """
@@ -559,7 +343,7 @@ class MultiRecognition(CustomRecognition):
         图像缩放规则：较短边缩放到720，长边按比例缩放
         """
         if roi == [0, 0, 0, 0]:
-            original_height, original_width = self._argv.image.shape[:2]
+            original_height, original_width = self.argv.image.shape[:2]
 
             if original_width <= original_height:
                 scaled_width = 720
@@ -593,17 +377,17 @@ class Count(CustomRecognition):
     - recognition: v2协议的recognition字段
       - type: 识别类型，默认DirectHit
       - param: 识别相关字段
+
+    每种不同的 recognition 定义对应一个按内容哈希命名的识别节点（count_16位哈希），
+    当前 Context 中不存在时才写入；DirectHit 直接在本地判定，不经过 run_recognition。
     """
 
     record = {}
 
     def __init__(self):
         super().__init__()
-        # 生成形如 count_16位数字 的唯一标志符
-        self._identifier = f"count_{random.randint(1000000000000000, 9999999999999999)}"
         # 上次使用时的 task_id
         self._pre_task_id = 0
-        logger.debug(f"Count实例创建，标志符: {self._identifier}")
 
     @classmethod
     def reset_count(cls, node_name: Optional[str] = None) -> None:
@@ -627,6 +411,7 @@ class Count(CustomRecognition):
         context: Context,
         argv: CustomRecognition.AnalyzeArg,
     ) -> Union[CustomRecognition.AnalyzeResult, Optional[RectType]]:
+        push_frame(argv.image, argv.node_name)
         try:
             params = json.loads(argv.custom_recognition_param)
             if not params:
@@ -651,19 +436,21 @@ class Count(CustomRecognition):
 
             # 未达指定次数
             if Count.record[node_name]["count"] < target_count:
-                context.override_pipeline(
-                    {self._identifier: {"recognition": recognition}}
-                )
-                reco_detail = context.run_recognition(self._identifier, argv.image)
+                box = self._direct_hit_box(recognition)
+                if box is None:
+                    identifier = self._register_node(context, recognition)
+                    reco_detail = run_recognition(context, identifier, argv.image)
+                    if reco_detail is not None:
+                        box = reco_detail.box
 
                 # 识别成功
-                if reco_detail is not None and reco_detail.box is not None:
+                if box is not None:
                     Count.record[node_name]["count"] += 1
                     logger.debug(
                         f"Count识别成功: {node_name}, 当前计数: {Count.record[node_name]['count']}"
                     )
                     return CustomRecognition.AnalyzeResult(
-                        box=reco_detail.box, detail=f"Count({node_name})"
+                        box=box, detail=f"Count({node_name})"
                     )
                 else:
                     # 识别失败
@@ -675,3 +462,40 @@ class Count(CustomRecognition):
         except Exception as e:
             logger.error(f"Count识别失败: {e}")
             return None
+
+    @staticmethod
+    def _direct_hit_box(recognition: Union[str, Dict[str, Any]]) -> Optional[RectType]:
+        """
+        DirectHit 直接返回 roi（默认 [0,0,0,0]），无需执行识别
+
+        非 DirectHit 或 roi 不是固定坐标时返回 None
+        """
+        if isinstance(recognition, str):
+            return [0, 0, 0, 0] if recognition == "DirectHit" else None
+
+        if recognition.get("type", "DirectHit") != "DirectHit":
+            return None
+
+        param = recognition.get("param", {})
+        roi = param.get("roi", recognition.get("roi", [0, 0, 0, 0]))
+        if isinstance(roi, list) and len(roi) == 4:
+            return list(roi)
+        return None
+
+    @staticmethod
+    def _register_node(
+        context: Context,
+        recognition: Union[str, Dict[str, Any]],
+    ) -> str:
+        """
+        按 recognition 内容哈希生成节点名，当前 Context 中还没有该节点时才写入 pipeline
+
+        override_pipeline 只对当前 Context 生效，run_task 启动的子任务使用新的 Context
+        （task_id 却相同），因此按 Context 中是否存在该节点判断，而不是按 task_id 记录。
+        """
+        content = json.dumps(recognition, sort_keys=True, ensure_ascii=False)
+        identifier = f"count_{hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]}"
+        if context.get_node_data(identifier) is None:
+            context.override_pipeline({identifier: {"recognition": recognition}})
+            logger.debug(f"Count注册识别节点: {identifier}")
+        return identifier
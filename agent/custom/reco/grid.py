@@ -0,0 +1,286 @@
+import json
+from typing import Any, Dict, List, Optional, Sequence, Set, Union
+
+from maa.agent.agent_server import AgentServer
+from maa.custom_recognition import CustomRecognition
+from maa.context import Context
+from maa.define import RectType
+from utils.logger import logger
+
+from custom.reco.cache import push_frame, run_recognition
+
+
+class GridLayout:
+    """
+    卡片网格布局：rows 行 cols 列，第 (i, j) 个格子左上角为 origin + (i * pitch_x, j * pitch_y)
+
+    格子序号按行优先排列：index = i + cols * j，i 为列号，j 为行号
+    """
+
+    def __init__(
+        self,
+        rows: int,
+        cols: int,
+        origin: Sequence[int],
+        pitch: Sequence[int],
+    ):
+        if rows <= 0 or cols <= 0:
+            raise ValueError(f"无效的网格尺寸: {rows}x{cols}")
+        self.rows = rows
+        self.cols = cols
+        self.origin = list(origin)
+        self.pitch = list(pitch)
+
+    @property
+    def size(self) -> int:
+        return self.rows * self.cols
+
+    def position(self, index: int) -> List[int]:
+        """格子序号 -> [列号, 行号]"""
+        return [index % self.cols, index // self.cols]
+
+    def offset(self, index: int) -> List[int]:
+        """第 index 个格子相对第 0 个格子的偏移"""
+        i, j = self.position(index)
+        return [i * self.pitch[0], j * self.pitch[1]]
+
+    def cell_roi(self, index: int, rect: Sequence[int]) -> List[int]:
+        """
+        将相对格子左上角的区域 [dx, dy, w, h] 转换为第 index 个格子的屏幕坐标
+        """
+        dx, dy = self.offset(index)
+        return [
+            self.origin[0] + dx + rect[0],
+            self.origin[1] + dy + rect[1],
+            rect[2],
+            rect[3],
+        ]
+
+    def bounding_roi(self, roi: Sequence[int]) -> List[int]:
+        """第 0 个格子中的 roi 扩展到所有格子后的外接区域"""
+        x, y, w, h = roi
+        return [
+            x,
+            y,
+            w + (self.cols - 1) * self.pitch[0],
+            h + (self.rows - 1) * self.pitch[1],
+        ]
+
+    def locate(self, box: Sequence[int], roi: Sequence[int]) -> Optional[int]:
+        """
+        判断匹配框落在哪个格子：box 需完整位于该格子对应的 roi 内，否则返回 None
+
+        roi 为第 0 个格子中的识别区域
+        """
+        x, y, w, h = roi
+        bx, by, bw, bh = box
+        i = (bx - x) // self.pitch[0] if self.pitch[0] else 0
+        j = (by - y) // self.pitch[1] if self.pitch[1] else 0
+        if not (0 <= i < self.cols and 0 <= j < self.rows):
+            return None
+        cell_x = x + i * self.pitch[0]
+        cell_y = y + j * self.pitch[1]
+        if bx + bw <= cell_x + w and by + bh <= cell_y + h:
+            return i + self.cols * j
+        return None
+
+
+def get_node_roi(context: Context, node_name: str) -> List[int]:
+    """读取节点的 roi（不含 roi_offset）"""
+    node_data = context.get_node_data(node_name)
+    return list(node_data["recognition"]["param"]["roi"])
+
+
+def filtered_results(reco_detail) -> List[Any]:
+    """识别详情中经过阈值和 NMS 过滤后的全部结果"""
+    if reco_detail is None:
+        return []
+    # 旧版本 maafw 中该字段拼写为 filterd_results
+    results = getattr(reco_detail, "filtered_results", None)
+    if results is None:
+        results = getattr(reco_detail, "filterd_results", None)
+    return results or []
+
+
+def match_cells(
+    context: Context,
+    image,
+    layout: GridLayout,
+    node_name: str,
+) -> Set[int]:
+    """
+    在所有格子的外接区域内识别一次，返回有匹配结果的格子序号
+
+    节点自身的 roi 视为第 0 个格子中的识别区域
+    """
+    roi = get_node_roi(context, node_name)
+    reco_detail = run_recognition(
+        context,
+        node_name,
+        image,
+        {node_name: {"roi": layout.bounding_roi(roi), "roi_offset": [0, 0, 0, 0]}},
+    )
+
+    cells = set()
+    for result in filtered_results(reco_detail):
+        index = layout.locate(list(result.box), roi)
+        if index is not None:
+            cells.add(index)
+    return cells
+
+
+def match_cell(
+    context: Context,
+    image,
+    layout: GridLayout,
+    node_name: str,
+    index: int,
+) -> bool:
+    """只识别第 index 个格子"""
+    dx, dy = layout.offset(index)
+    reco_detail = run_recognition(
+        context,
+        node_name,
+        image,
+        {node_name: {"roi_offset": [dx, dy, 0, 0]}},
+    )
+    return reco_detail is not None and reco_detail.box is not None
+
+
+def scan_grid(
+    context: Context,
+    image,
+    layout: GridLayout,
+    classifiers: List[Dict[str, Any]],
+    default_state: int = 0,
+    mode: str = "grid",
+) -> List[int]:
+    """
+    识别每个格子的状态
+
+    classifiers 为 [{"node": 节点名, "state": 状态值}, ...]，按顺序判定，先匹配的优先。
+    mode 为 "grid" 时每个节点只识别一次；为 "cell" 时逐格识别。
+    """
+    states = [default_state] * layout.size
+
+    if mode == "cell":
+        for index in range(layout.size):
+            for classifier in classifiers:
+                if match_cell(context, image, layout, classifier["node"], index):
+                    states[index] = classifier["state"]
+                    break
+        return states
+
+    assigned = set()
+    for classifier in classifiers:
+        cells = match_cells(context, image, layout, classifier["node"]) - assigned
+        for index in cells:
+            states[index] = classifier["state"]
+        assigned |= cells
+    return states
+
+
+def select_cell(
+    states: List[int],
+    policy: str = "first_not",
+    state: Union[int, List[int]] = 1,
+) -> Optional[int]:
+    """
+    按策略选择下一个格子
+
+    - "first": 第一个状态属于 state 的格子
+    - "first_not": 第一个状态不属于 state 的格子
+    """
+    wanted = state if isinstance(state, list) else [state]
+    for index, value in enumerate(states):
+        if (value in wanted) == (policy == "first"):
+            return index
+    return None
+
+
+@AgentServer.custom_recognition("GridScan")
+class GridScan(CustomRecognition):
+    """
+    通用卡片网格扫描。
+
+    参数格式：
+    {
+        "rows": int,
+        "cols": int,
+        "origin": int[2],
+        "pitch": int[2],
+        "classifiers": [{"node": string, "state": int}, ...],
+        "default_state": int,
+        "mode": "grid|cell",
+        "select": {
+            "policy": "first|first_not",
+            "state": int|int[],
+            "target": int[4]
+        }
+    }
+
+    字段说明：
+    - rows/cols: 网格行数、列数
+    - origin: 第 0 个格子的左上角坐标
+    - pitch: 相邻格子在 x、y 方向的间距
+    - classifiers: 状态分类节点，节点自身的 roi 对应第 0 个格子，按顺序判定，先匹配的优先
+    - default_state: 没有任何分类节点匹配时的状态，默认 0
+    - mode: "grid" 每个分类节点在所有格子的外接区域识别一次（默认）；"cell" 逐格识别
+    - select: 可选，下一个格子的选择策略
+      - policy: "first" 第一个状态属于 state 的格子；"first_not" 第一个状态不属于 state 的格子
+      - target: 相对格子左上角的返回区域 [dx, dy, w, h]，默认整个格子
+      - 没有符合条件的格子时识别失败
+
+    返回：box 为选中格子的 target 区域（未设置 select 时为 [0,0,0,0]），
+    detail 为 {"states": [...], "next": 序号或null} 的 JSON。
+    最近一次结果按节点名保存在 GridScan.results 中。
+    """
+
+    results: Dict[str, List[int]] = {}
+
+    def analyze(
+        self,
+        context: Context,
+        argv: CustomRecognition.AnalyzeArg,
+    ) -> Union[CustomRecognition.AnalyzeResult, Optional[RectType]]:
+        push_frame(argv.image, argv.node_name)
+        try:
+            params = json.loads(argv.custom_recognition_param)
+            layout = GridLayout(
+                params["rows"], params["cols"], params["origin"], params["pitch"]
+            )
+            classifiers = params["classifiers"]
+            states = scan_grid(
+                context,
+                argv.image,
+                layout,
+                classifiers,
+                params.get("default_state", 0),
+                params.get("mode", "grid"),
+            )
+            GridScan.results[argv.node_name] = states
+            logger.debug(f"GridScan({argv.node_name}): {states}")
+
+            select = params.get("select")
+            if select is None:
+                return CustomRecognition.AnalyzeResult(
+                    box=[0, 0, 0, 0],
+                    detail=json.dumps({"states": states, "next": None}),
+                )
+
+            index = select_cell(
+                states, select.get("policy", "first_not"), select.get("state", 1)
+            )
+            if index is None:
+                logger.debug(f"GridScan({argv.node_name}): 没有符合条件的格子")
+                return None
+
+            target = select.get("target", [0, 0, *layout.pitch])
+            return CustomRecognition.AnalyzeResult(
+                box=layout.cell_roi(index, target),
+                detail=json.dumps({"states": states, "next": index}),
+            )
+
+        except Exception as e:
+            logger.error(f"GridScan识别失败: {e}")
+            return None
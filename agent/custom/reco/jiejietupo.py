@@ -1,6 +1,6 @@
-# [x0, y0, delta_x, delta_y] [146,143,332,135]
 import json
-from typing import Any, Dict, List, Union, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple, Union, Optional
 
 from maa.agent.agent_server import AgentServer
 from maa.custom_recognition import CustomRecognition
@@ -8,81 +8,143 @@ from maa.context import Context
 from maa.define import RectType
 from utils.logger import logger
 
+from custom.reco.cache import push_frame
+from custom.reco.grid import GridLayout, match_cell, scan_grid, select_cell
+
+
+class TuPoState:
+    """单个任务内的结界突破状态"""
+
+    def __init__(self, size: int):
+        self.status = [0] * size
+        # 最近一次选中去挑战的格子，下次扫描时只需重新识别它
+        self.pending: Optional[int] = None
+        self.scanned = False
+
 
 @AgentServer.custom_recognition("InitTuPoStatus")
 class InitTuPoStatus(CustomRecognition):
     """
+    扫描结界突破界面 3x3 结界的状态，1 为已突破，-1 为突破失败，0 为未挑战。
+
+    状态按 (task_id, 当前角色名) 分别保存：多角色任务中各角色的子任务共用同一个
+    task_id，按角色名区分，切换角色后重新扫描。选中结界挑战后，下一次扫描只重新识别被挑战的格子，
+    并抽查一个已有结果的格子；抽查不符（界面已刷新）或被挑战格子仍为未挑战时，
+    再做全量扫描。
+
     参数：
+    {
+        "mode": "grid|cell",
+        "full": bool
+    }
+
+    - mode: 全量扫描方式，默认 "grid"，含义同 GridScan
+    - full: 为 true 时总是全量扫描，默认 false
     """
 
-    x0, y0, delta_x, delta_y = 146, 143, 332, 135
-    topu_status = [0 for i in range(9)]
+    # 第 0 个结界卡片左上角 [146, 143]，卡片间距 [332, 135]
+    layout = GridLayout(rows=3, cols=3, origin=[146, 143], pitch=[332, 135])
+    classifiers = [
+        {"node": "RCO-检测突破成功", "state": 1},
+        {"node": "RCO-检测突破失败", "state": -1},
+    ]
+    # 点击区域，相对卡片左上角
+    target = [161, 27, 123, 74]
+
+    # 保留最近几个任务的状态
+    MAX_TASKS = 4
+    _states: "OrderedDict[Tuple[int, str], TuPoState]" = OrderedDict()
+
+    @staticmethod
+    def state_key(
+        context: Context, argv: CustomRecognition.AnalyzeArg
+    ) -> Tuple[int, str]:
+        """(task_id, 当前角色名)，不在多角色任务中时角色名为空"""
+        node_info = context.get_node_data("重写账号角色信息") or {}
+        account_info = (
+            node_info.get("action", {}).get("param", {}).get("custom_action_param")
+        )
+        rolename = (
+            account_info.get("rolename", "") if isinstance(account_info, dict) else ""
+        )
+        return argv.task_detail.task_id, rolename
+
+    @classmethod
+    def get_state(cls, key: Tuple[int, str]) -> TuPoState:
+        state = cls._states.get(key)
+        if state is None:
+            state = TuPoState(cls.layout.size)
+            cls._states[key] = state
+            while len(cls._states) > cls.MAX_TASKS:
+                cls._states.popitem(last=False)
+        else:
+            cls._states.move_to_end(key)
+        return state
 
     def analyze(
         self,
         context: Context,
         argv: CustomRecognition.AnalyzeArg,
     ) -> Union[CustomRecognition.AnalyzeResult, Optional[RectType]]:
-        params = json.loads(argv.custom_recognition_param)
-
-        for i in range(3):
-            for j in range(3):
-                reco_detail1 = context.run_recognition(
-                    "RCO-检测突破成功",
-                    argv.image,
-                    {
-                        "RCO-检测突破成功": {
-                            "roi_offset": [self.delta_x * i, self.delta_y * j, 0, 0]
-                        }
-                    },
-                )
-                # logger.debug(reco_detail1)
-                if reco_detail1:
-                    InitTuPoStatus.topu_status[i + 3 * j] = 1
-                    continue
-
-                # try:
-                #     result1 = reco_detail1.best_result
-                #     logger.debug(result1)
-                # except:
-                #     pass
-
-                reco_detail2 = context.run_recognition(
-                    "RCO-检测突破失败",
-                    argv.image,
-                    {
-                        "RCO-检测突破失败": {
-                            "roi_offset": [self.delta_x * i, self.delta_y * j, 0, 0]
-                        }
-                    },
-                )
-                # logger.debug(reco_detail2)
-                if reco_detail2:
-                    InitTuPoStatus.topu_status[i + 3 * j] = -1
-                    continue
-                else:
-                    InitTuPoStatus.topu_status[i + 3 * j] = 0
-                # try:
-                #     result2 = reco_detail2.best_result
-                #     logger.debug(result2)
-                # except:
-                #     pass
-        logger.debug(InitTuPoStatus.topu_status)
+        push_frame(argv.image, argv.node_name)
+        params = json.loads(argv.custom_recognition_param or "{}") or {}
+        state = self.get_state(self.state_key(context, argv))
+
+        updated = False
+        if state.scanned and state.pending is not None and not params.get("full"):
+            updated = self._update_pending(context, argv.image, state)
+
+        if not updated:
+            state.status = scan_grid(
+                context,
+                argv.image,
+                self.layout,
+                self.classifiers,
+                mode=params.get("mode", "grid"),
+            )
+            state.scanned = True
+
+        state.pending = None
+        logger.debug(state.status)
         return CustomRecognition.AnalyzeResult(box=[0, 0, 0, 0], detail="")
 
+    def _classify_cell(self, context: Context, image, index: int) -> int:
+        for classifier in self.classifiers:
+            if match_cell(context, image, self.layout, classifier["node"], index):
+                return classifier["state"]
+        return 0
+
+    def _update_pending(self, context: Context, image, state: TuPoState) -> bool:
+        """
+        只更新被挑战的格子，状态可疑时返回 False 以触发全量扫描
+        """
+        index = state.pending
+        value = self._classify_cell(context, image, index)
+        if value == 0:
+            logger.debug(f"结界 {index} 挑战后仍为未挑战状态，重新全量扫描")
+            return False
+
+        # 抽查一个已有结果的其它格子，确认界面没有刷新
+        anchors = [i for i, v in enumerate(state.status) if v != 0 and i != index]
+        if anchors:
+            anchor = anchors[0]
+            if self._classify_cell(context, image, anchor) != state.status[anchor]:
+                logger.debug(f"结界 {anchor} 状态变化，界面已刷新，重新全量扫描")
+                return False
+
+        state.status[index] = value
+        return True
+
     @classmethod
-    def get_next_tupo(self):
-        index = None
-        for i, v in enumerate(self.topu_status):
-            if v != 1:
-                index = i
-                break
-
-        j = index // 3
-        i = index % 3
-        roi = [307 + i * self.delta_x, 170 + j * self.delta_y, 123, 74]
-        # logger.debug(roi)
-        # logger.debug(f"{i}, {j}")
+    def get_next_tupo(cls, key: Tuple[int, str]):
+        state = cls.get_state(key)
+        index = select_cell(state.status, "first_not", 1)
+        if index is None:
+            return None
+
+        state.pending = index
+        i, j = cls.layout.position(index)
+        roi = cls.layout.cell_roi(index, cls.target)
         return CustomRecognition.AnalyzeResult(roi, f"({i}, {j})")
 
 
@@ -93,8 +155,10 @@ class IsLastTuPo(InitTuPoStatus):
         context: Context,
         argv: CustomRecognition.AnalyzeArg,
     ) -> Union[CustomRecognition.AnalyzeResult, Optional[RectType]]:
-        if IsLastTuPo.topu_status.count(1) >= 8:
-            return IsLastTuPo.get_next_tupo()
+        push_frame(argv.image, argv.node_name)
+        key = self.state_key(context, argv)
+        if self.get_state(key).status.count(1) >= 8:
+            return self.get_next_tupo(key)
         else:
             return None
 
@@ -106,4 +170,5 @@ class GetNextTuPo(InitTuPoStatus):
         context: Context,
         argv: CustomRecognition.AnalyzeArg,
     ) -> Union[CustomRecognition.AnalyzeResult, Optional[RectType]]:
-        return GetNextTuPo.get_next_tupo()
+        push_frame(argv.image, argv.node_name)
+        return self.get_next_tupo(self.state_key(context, argv))
@@ -0,0 +1,49 @@
+"""
+把 pipeline 每一轮识别使用的画面推入出错排查用的帧缓冲。
+
+大部分节点是 OCR、TemplateMatch 等内置识别，不经过自定义识别，
+这里通过上下文事件监听在每一轮 next 列表的第一个识别开始时取控制器当前画面，
+同一轮其余节点的识别共用这一帧，只追加节点名；识别命中的节点名也追加到该帧。
+
+上下文事件监听需要 maafw 5.x，旧版本中只有自定义识别和 LogAnError 推入帧。
+"""
+
+from maa.agent.agent_server import AgentServer
+
+from utils.frame_buffer import frame_buffer
+from utils.logger import logger
+
+try:
+    from maa.context import ContextEventSink
+    from maa.event_sink import NotificationType
+except ImportError:
+    ContextEventSink = None
+
+
+if ContextEventSink is not None and hasattr(AgentServer, "context_sink"):
+
+    @AgentServer.context_sink()
+    class FrameBufferSink(ContextEventSink):
+        def __init__(self):
+            super().__init__()
+            # 新一轮 next 列表开始后，第一个识别开始时才截取画面（此时已完成截图）
+            self._new_round = True
+
+        def on_node_next_list(self, context, noti_type, detail):
+            if noti_type == NotificationType.Starting:
+                self._new_round = True
+
+        def on_node_recognition(self, context, noti_type, detail):
+            if noti_type == NotificationType.Starting:
+                if self._new_round:
+                    self._new_round = False
+                    frame_buffer.push(
+                        context.tasker.controller.cached_image, detail.name
+                    )
+                else:
+                    frame_buffer.annotate(detail.name)
+            elif noti_type == NotificationType.Succeeded:
+                frame_buffer.annotate(f"{detail.name}(命中)")
+
+else:
+    logger.debug("当前 maafw 不支持上下文事件监听，帧缓冲只记录自定义识别的画面")
@@ -384,6 +384,11 @@ def agent(is_dev_mode=False):
         AgentServer.join()
         AgentServer.shut_down()
         logger.info("AgentServer关闭")
+
+        # 写完后台队列中剩余的截图
+        from utils.image_writer import image_writer
+
+        image_writer.shutdown()
     except ImportError as e:
         logger.error(f"导入模块失败: {e}")
         logger.error("考虑重新配置环境")
@@ -0,0 +1,76 @@
+"""
+进程内的中止信号。
+
+LogAnError 调用 abort_signal.set() 记录出错，多角色、多任务的循环在开始时 mark()，
+之后每轮用 is_set_since() 判断是否需要终止后续任务，只比较内存中的计数。
+
+user_data/error.log 仅作为审计记录保留：set() 仍会追加一行时间戳。
+其他进程写入的记录通过文件大小发现，只读取 mark() 之后新增的部分。
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from .logger import logger
+
+ERROR_LOG_PATH = "user_data/error.log"
+
+
+class AbortMark:
+    """mark() 时的信号状态"""
+
+    def __init__(self, generation: int, log_offset: int):
+        self.generation = generation
+        self.log_offset = log_offset
+
+
+class AbortSignal:
+    def __init__(self, log_path: str = ERROR_LOG_PATH):
+        self.log_path = log_path
+        self.reason: Optional[str] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def set(self, reason: str = "") -> None:
+        """记录一次出错，并在错误日志中追加时间戳"""
+        with self._lock:
+            self._generation += 1
+            self.reason = reason
+
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, mode="a", encoding="utf-8") as f:
+                f.write(now + "\n")
+        except OSError as e:
+            logger.warning(f"写入错误日志失败: {e}")
+
+    def mark(self) -> AbortMark:
+        """记录当前状态，之后用 is_set_since 判断在此之后是否出错"""
+        return AbortMark(self._generation, self._log_size())
+
+    def is_set_since(self, mark: AbortMark) -> bool:
+        if self._generation != mark.generation:
+            return True
+
+        # 其他进程写入的错误记录
+        size = self._log_size()
+        if size <= mark.log_offset:
+            return False
+        try:
+            with open(self.log_path, mode="r", encoding="utf-8") as f:
+                f.seek(mark.log_offset)
+                return any(line.strip() for line in f)
+        except OSError:
+            return False
+
+    def _log_size(self) -> int:
+        try:
+            return os.stat(self.log_path).st_size
+        except OSError:
+            return 0
+
+
+abort_signal = AbortSignal()
@@ -1,41 +1,89 @@
-import pandas as pd
+import os
+import csv
+import threading
+from typing import Dict, List, Optional, Tuple
 
 from .logger import logger
 
 csv_path = "user_data/account_info.csv"
 
+REQUIRED_COLUMNS = {"account", "platform", "servername", "rolename"}
+
+
+class AccountIndex:
+    """
+    account_info.csv 的内存索引，按角色名查找账号、平台和服务器名信息。
+
+    文件只在第一次使用、以及修改时间或大小变化后重新读取，列名也只在读取时检查一次。
+    同名角色以第一次出现的行为准。所有值都按字符串读取。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._roles: Dict[str, Dict[str, str]] = {}
+        self._rolenames: List[str] = []
+        self._lock = threading.Lock()
+
+    def get(self, rolename: str) -> Optional[Dict[str, str]]:
+        self._refresh()
+        info = self._roles.get(rolename)
+        return dict(info) if info else None
+
+    def rolenames(self) -> List[str]:
+        self._refresh()
+        return list(self._rolenames)
+
+    def _refresh(self) -> None:
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            self._load()
+            self._stamp = stamp
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            columns = set(reader.fieldnames or [])
+            if not REQUIRED_COLUMNS.issubset(columns):
+                raise ValueError(f"CSV文件缺少必要列：{REQUIRED_COLUMNS - columns}")
+
+            roles = {}
+            rolenames = []
+            for row in reader:
+                rolename = row["rolename"]
+                if not rolename:
+                    continue
+                rolenames.append(rolename)
+                if rolename not in roles:
+                    roles[rolename] = {
+                        "account": row["account"],
+                        "platform": row["platform"],
+                        "servername": row["servername"],
+                    }
+
+        self._roles = roles
+        self._rolenames = rolenames
+        logger.debug(f"已读取账号信息 {self.path}，共 {len(rolenames)} 个角色")
+
+
+account_index = AccountIndex(csv_path)
+
 
 def find_role_info(rolename):
     """
     根据角色名从CSV文件中查找账号、平台和服务器名信息。
 
     参数：
-        csv_path (str): CSV 文件路径。
         rolename (str): 要查找的角色名。
 
     返回：
-        List[dict]: 每个命中行的信息组成的列表。
-                    每个元素是一个 dict，包含 account、platform 和 servername。
+        dict: 包含 account、platform 和 servername，找不到时返回空列表。
     """
     try:
-        df = pd.read_csv(csv_path)
-
-        # 检查必要列是否存在
-        required_columns = {"account", "platform", "servername", "rolename"}
-        if not required_columns.issubset(df.columns):
-            raise ValueError(f"CSV文件缺少必要列：{required_columns - set(df.columns)}")
-
-        # 查找角色名匹配的行
-        matched = df[df["rolename"] == rolename]
-
-        # 将匹配的结果转换为字典列表返回
-        result = matched[["account", "platform", "servername"]].to_dict(
-            orient="records"
-        )
-        if not result:
-            return []
-        else:
-            return result[0]
+        return account_index.get(rolename) or []
 
     except FileNotFoundError:
         logger.error(f"文件未找到：{csv_path}")
@@ -53,14 +101,7 @@ def get_all_rolenames():
         List[str]: 所有rolename列的值组成的列表。
     """
     try:
-        df = pd.read_csv(csv_path)
-
-        if "rolename" not in df.columns:
-            raise ValueError("CSV文件中缺少 'rolename' 列")
-
-        # 去除空值并转为列表
-        rolenames = df["rolename"].dropna().tolist()
-        return rolenames
+        return account_index.rolenames()
 
     except FileNotFoundError:
         logger.error(f"文件未找到：{csv_path}")
@@ -70,5 +111,32 @@ def get_all_rolenames():
         return []
 
 
+def get_roles_info(rolenames):
+    """
+    查找多个角色的账号、平台和服务器名信息。
+
+    参数：
+        rolenames (List[str]): 要查找的角色名列表。
+
+    返回：
+        Dict[str, dict]: 角色名到信息的映射，找不到的角色不在其中。
+                         每个值是一个 dict，包含 account、platform 和 servername。
+    """
+    try:
+        roles_info = {}
+        for rolename in rolenames:
+            info = account_index.get(rolename)
+            if info:
+                roles_info[rolename] = info
+        return roles_info
+
+    except FileNotFoundError:
+        logger.error(f"文件未找到：{csv_path}")
+        return {}
+    except Exception as e:
+        logger.error(f"发生错误：{e}")
+        return {}
+
+
 if __name__ == "__main__":
     print(get_all_rolenames())
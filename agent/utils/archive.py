@@ -0,0 +1,161 @@
+"""
+按天追加的截图归档。
+
+每天一个容器文件 {日期}.frames，依次写入 [8 字节小端长度][编码后的图片数据]；
+同名的 {日期}.index.jsonl 每行记录一帧：
+{"name", "rolename", "time", "format", "container", "offset", "length"}
+
+- offset 指向图片数据的起始位置（长度前缀之后），读取单帧时只需读索引再 seek
+- container 为数据所在容器的日期，去重时的“硬链接”记录可以指向其他日期的容器
+- 先写数据再写索引，进程中断时最多留下一段没有索引的数据，不影响已有记录
+"""
+
+import os
+import json
+import struct
+import threading
+from typing import Dict, List, Optional
+
+from .logger import logger
+
+CONTAINER_SUFFIX = ".frames"
+INDEX_SUFFIX = ".index.jsonl"
+
+_LENGTH = struct.Struct("<Q")
+
+
+def container_path(archive_dir: str, day: str) -> str:
+    return os.path.join(archive_dir, day + CONTAINER_SUFFIX)
+
+
+def index_path(archive_dir: str, day: str) -> str:
+    return os.path.join(archive_dir, day + INDEX_SUFFIX)
+
+
+def list_days(archive_dir: str) -> List[str]:
+    """归档目录中已有的日期，按时间排序"""
+    if not os.path.isdir(archive_dir):
+        return []
+    return sorted(
+        name[: -len(INDEX_SUFFIX)]
+        for name in os.listdir(archive_dir)
+        if name.endswith(INDEX_SUFFIX)
+    )
+
+
+def read_index(archive_dir: str, day: str) -> List[Dict]:
+    """读取某天的索引，跳过损坏的行"""
+    records = []
+    path = index_path(archive_dir, day)
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"跳过损坏的归档索引行: {line.strip()}")
+    return records
+
+
+def read_frame(archive_dir: str, record: Dict) -> bytes:
+    """按索引记录读取一帧编码后的数据"""
+    offset = record["offset"]
+    length = record["length"]
+    with open(container_path(archive_dir, record["container"]), "rb") as f:
+        f.seek(offset - _LENGTH.size)
+        (stored_length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        if stored_length != length:
+            raise ValueError(
+                f"归档数据损坏: {record['name']} 长度 {stored_length} != {length}"
+            )
+        return f.read(length)
+
+
+class FrameArchive:
+    """单个归档目录的写入器"""
+
+    def __init__(self, archive_dir: str):
+        self.archive_dir = archive_dir
+        # 日期 -> 帧名 -> 索引记录，按需从索引文件读入
+        self._records: Dict[str, Dict[str, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def append(self, name: str, data: bytes, meta: Dict) -> Dict:
+        """
+        追加一帧，返回索引记录
+
+        meta 需包含 day（容器日期），以及写入索引的 rolename、time、format
+        """
+        day = meta["day"]
+        with self._lock:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            with open(container_path(self.archive_dir, day), "ab") as f:
+                f.write(_LENGTH.pack(len(data)))
+                offset = f.tell()
+                f.write(data)
+
+            record = {
+                "name": name,
+                "rolename": meta.get("rolename"),
+                "time": meta.get("time"),
+                "format": meta.get("format"),
+                "container": day,
+                "offset": offset,
+                "length": len(data),
+            }
+            self._write_record(day, record)
+        return record
+
+    def link(self, name: str, new_name: str, meta: Dict) -> bool:
+        """为已归档的帧 name 追加一条指向同一数据的新记录"""
+        with self._lock:
+            source = self._find(name)
+            if source is None:
+                return False
+            record = dict(
+                source,
+                name=new_name,
+                rolename=meta.get("rolename"),
+                time=meta.get("time"),
+            )
+            self._write_record(meta["day"], record)
+        return True
+
+    def contains(self, name: str) -> bool:
+        with self._lock:
+            return self._find(name) is not None
+
+    def _find(self, name: str) -> Optional[Dict]:
+        # 调用方需持有 self._lock；帧名以日期开头，只需读取对应日期的索引
+        for day in {name[:10], *self._records}:
+            record = self._day_records(day).get(name)
+            if record is not None:
+                return record
+        return None
+
+    def _day_records(self, day: str) -> Dict[str, Dict]:
+        records = self._records.get(day)
+        if records is None:
+            records = {r["name"]: r for r in read_index(self.archive_dir, day)}
+            self._records[day] = records
+        return records
+
+    def _write_record(self, day: str, record: Dict) -> None:
+        with open(index_path(self.archive_dir, day), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._day_records(day)[record["name"]] = record
+
+
+_archives: Dict[str, FrameArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def get_frame_archive(archive_dir: str) -> FrameArchive:
+    key = os.path.abspath(archive_dir)
+    with _archives_lock:
+        archive = _archives.get(key)
+        if archive is None:
+            archive = FrameArchive(archive_dir)
+            _archives[key] = archive
+        return archive
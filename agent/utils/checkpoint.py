@@ -0,0 +1,100 @@
+"""
+多角色任务的断点记录。
+
+每次运行以 (角色列表, 任务列表, 游戏日) 计算一个键，对应 user_data/checkpoints/{键}.json，
+记录已经完成的 (角色, 任务)。每完成一项就原子地重写一次文件（先写临时文件再 os.replace），
+进程在任意时刻中断都不会留下损坏的记录。游戏日在每天 5 点刷新，之前游戏日的记录在加载或第一次写入时清理。
+"""
+
+import os
+import json
+import hashlib
+from typing import List, Set, Tuple
+
+from .logger import logger
+
+CHECKPOINT_DIR = "user_data/checkpoints"
+
+
+class Checkpoint:
+    def __init__(
+        self,
+        rolenames: List[str],
+        tasknames: List[str],
+        game_day: str,
+        checkpoint_dir: str = CHECKPOINT_DIR,
+    ):
+        self.game_day = game_day
+        # 角色顺序可能被调度改变，键只与角色集合有关
+        key_source = json.dumps(
+            [sorted(rolenames), tasknames, game_day], ensure_ascii=False
+        )
+        self.key = hashlib.sha1(key_source.encode("utf-8")).hexdigest()[:16]
+        self.checkpoint_dir = checkpoint_dir
+        self.path = os.path.join(checkpoint_dir, f"{self.key}.json")
+        self._done: Set[Tuple[str, str]] = set()
+        self._cleaned = False
+
+    def load(self) -> int:
+        """读取已完成的记录并清理过期的记录文件，返回已完成的数量"""
+        self._remove_stale_once()
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._done = {tuple(item) for item in data.get("done", [])}
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取断点记录失败，从头开始: {e}")
+            self._done = set()
+        return len(self._done)
+
+    def is_done(self, rolename: str, taskname: str) -> bool:
+        return (rolename, taskname) in self._done
+
+    def mark_done(self, rolename: str, taskname: str) -> None:
+        if (rolename, taskname) in self._done:
+            return
+        self._done.add((rolename, taskname))
+        self._save()
+
+    def _save(self) -> None:
+        """写入失败（磁盘已满、没有权限等）只记录警告，不影响任务执行"""
+        # 不使用 resume 时不会调用 load，在第一次写入时清理过期的记录
+        self._remove_stale_once()
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(self.checkpoint_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"game_day": self.game_day, "done": sorted(self._done)},
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"写入断点记录失败: {e}")
+
+    def _remove_stale_once(self) -> None:
+        if self._cleaned:
+            return
+        self._cleaned = True
+        self._remove_stale()
+
+    def _remove_stale(self) -> None:
+        if not os.path.isdir(self.checkpoint_dir):
+            return
+        for name in os.listdir(self.checkpoint_dir):
+            path = os.path.join(self.checkpoint_dir, name)
+            if not name.endswith(".json") or path == self.path:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    game_day = json.load(f).get("game_day")
+            except (OSError, ValueError):
+                game_day = None
+            if game_day != self.game_day:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"清理过期断点记录失败: {e}")
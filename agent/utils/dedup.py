@@ -0,0 +1,118 @@
+"""
+截图去重：基于差值哈希（dHash）判断画面是否与最近保存的截图近似。
+
+哈希从降采样的灰度画面计算：整帧按网格取样后缩小到 8x9，
+比较每行相邻像素的明暗得到 64 位哈希，两帧哈希的汉明距离越小越相似。
+
+每个保存目录下维护一个索引文件 .dhash_index，每行一条 "哈希 文件名"，
+只追加写入，启动后第一次使用时读入最近的若干条，因此去重在多次运行之间同样有效。
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+from .logger import logger
+
+INDEX_FILE_NAME = ".dhash_index"
+# 内存中保留、参与比较的最近哈希条数
+DEFAULT_RECENT = 256
+DEFAULT_THRESHOLD = 4
+
+# 取样网格为哈希尺寸的倍数，块内取平均以抑制噪点
+_HASH_ROWS = 8
+_HASH_COLS = 9
+_SAMPLES_PER_CELL = 4
+
+
+def dhash(frame: np.ndarray) -> int:
+    """计算 BGR 或单通道画面的 64 位差值哈希"""
+    height, width = frame.shape[:2]
+    rows = np.linspace(0, height - 1, _HASH_ROWS * _SAMPLES_PER_CELL).astype(np.intp)
+    cols = np.linspace(0, width - 1, _HASH_COLS * _SAMPLES_PER_CELL).astype(np.intp)
+    sample = frame[np.ix_(rows, cols)].astype(np.float32)
+
+    if sample.ndim == 3:
+        # BGR 亮度
+        sample = sample @ np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+    small = sample.reshape(
+        _HASH_ROWS, _SAMPLES_PER_CELL, _HASH_COLS, _SAMPLES_PER_CELL
+    ).mean(axis=(1, 3))
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class HashIndex:
+    """单个保存目录的哈希索引"""
+
+    def __init__(self, save_dir: str, recent: int = DEFAULT_RECENT):
+        self.path = os.path.join(save_dir, INDEX_FILE_NAME)
+        self._entries: "deque[tuple]" = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    value, _, file_name = line.rstrip("\n").partition(" ")
+                    if file_name:
+                        self._entries.append((int(value, 16), file_name))
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取截图哈希索引失败 {self.path}: {e}")
+            return
+
+        # 只有最近的记录会参与比较，索引文件过长时截断
+        if lines > self._entries.maxlen * 4:
+            self._rewrite()
+
+    def _rewrite(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for value, file_name in self._entries:
+                f.write(f"{value:016x} {file_name}\n")
+        os.replace(tmp_path, self.path)
+
+    def find(self, value: int, threshold: int, ext: str = "") -> Optional[str]:
+        """返回与 value 汉明距离不超过 threshold 的最近一条记录的文件名"""
+        with self._lock:
+            for entry_value, file_name in reversed(self._entries):
+                if ext and not file_name.endswith(ext):
+                    continue
+                if hamming(value, entry_value) <= threshold:
+                    return file_name
+        return None
+
+    def add(self, value: int, file_name: str) -> None:
+        with self._lock:
+            self._entries.append((value, file_name))
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(f"{value:016x} {file_name}\n")
+
+
+_indexes: Dict[str, HashIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_hash_index(save_dir: str) -> HashIndex:
+    """获取保存目录对应的哈希索引，同一目录只读取一次索引文件"""
+    key = os.path.abspath(save_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = HashIndex(save_dir)
+            _indexes[key] = index
+        return index
@@ -0,0 +1,105 @@
+"""
+模拟人工操作的随机延时。
+
+延时按配置的分布抽样，每种分布都有明确的上下限：
+- "legacy": 原有行为，gauss(2, 0.5)，小于 1 的抽样改为 10 / 20 / 30 秒的长停顿（默认）
+- "normal": 截断正态分布，参数 mean、std、min、max
+- "lognormal": 对数正态分布，参数 median、sigma、min、max，偶尔出现较长的停顿
+- "fixed": 固定延时，参数 value
+- "fast": 可信环境使用的短延时，即 mean 0.3、std 0.1、范围 [0.1, 0.6] 的 normal
+
+另外可以为每个角色设置累计延时预算（秒），同一角色的延时总和不超过预算，
+预算用完后该角色后续的延时为 0。角色切换时预算重新计算。
+"""
+
+import math
+import random
+import threading
+from typing import Dict, Optional
+
+from .logger import logger
+
+DELAY_PROFILES: Dict[str, Dict] = {
+    "legacy": {"distribution": "legacy", "min": 0, "max": 30},
+    "normal": {"distribution": "normal", "mean": 2, "std": 0.5, "min": 1, "max": 4},
+    "lognormal": {
+        "distribution": "lognormal",
+        "median": 2,
+        "sigma": 0.5,
+        "min": 0.5,
+        "max": 10,
+    },
+    "fixed": {"distribution": "fixed", "value": 2},
+    "fast": {"distribution": "normal", "mean": 0.3, "std": 0.1, "min": 0.1, "max": 0.6},
+}
+DEFAULT_PROFILE = "legacy"
+
+
+def resolve_profile(param: Dict) -> Dict:
+    """
+    由动作参数得到延时配置：以 profile 指定的内置配置为基础，参数中的同名字段覆盖内置值
+    """
+    name = param.get("profile", DEFAULT_PROFILE)
+    if name not in DELAY_PROFILES:
+        raise ValueError(f"无效的延时配置: {name}")
+    profile = dict(DELAY_PROFILES[name])
+    for key in ("mean", "std", "median", "sigma", "value", "min", "max"):
+        if key in param:
+            profile[key] = float(param[key])
+    return profile
+
+
+def sample_delay(profile: Dict, rng: random.Random = random) -> float:
+    """按配置抽样一次延时（秒），结果限制在 [min, max] 内"""
+    distribution = profile["distribution"]
+    if distribution == "fixed":
+        return float(profile["value"])
+
+    if distribution == "legacy":
+        t = rng.gauss(2, 0.5)
+        if t < 0.5:
+            t = 30
+        elif t < 0.8:
+            t = 20
+        elif t < 1:
+            t = 10
+    elif distribution == "normal":
+        t = rng.gauss(profile["mean"], profile["std"])
+    elif distribution == "lognormal":
+        t = rng.lognormvariate(math.log(profile["median"]), profile["sigma"])
+    else:
+        raise ValueError(f"无效的延时分布: {distribution}")
+
+    return min(max(t, profile["min"]), profile["max"])
+
+
+class DelayBudget:
+    """按角色累计延时，超出预算的部分不再等待"""
+
+    def __init__(self):
+        self._rolename: Optional[str] = None
+        self._spent = 0.0
+        self._lock = threading.Lock()
+
+    def take(self, rolename: str, delay: float, budget: Optional[float]) -> float:
+        """从角色的预算中扣除延时，返回实际可用的延时"""
+        with self._lock:
+            if rolename != self._rolename:
+                self._rolename = rolename
+                self._spent = 0.0
+            if budget is not None:
+                remaining = max(budget - self._spent, 0.0)
+                if delay > remaining:
+                    logger.debug(
+                        f"角色 {rolename} 的延时预算 {budget}s 已用完，"
+                        f"延时 {delay:.2f}s 缩短为 {remaining:.2f}s"
+                    )
+                    delay = remaining
+            self._spent += delay
+            return delay
+
+    def spent(self) -> float:
+        return self._spent
+
+
+delay_budget = DelayBudget()
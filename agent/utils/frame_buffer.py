@@ -0,0 +1,148 @@
+"""
+最近若干帧画面的内存环形缓冲，用于出错后的事后排查。
+
+pipeline 每一轮识别的画面由上下文事件监听推入缓冲（见 custom/sink.py），
+自定义识别（custom/reco/cache.py 的 push_frame）、utils/wait.py 的截图
+以及 LogAnError 保存前控制器当前的画面也会推入。
+缓冲在第一次推入时按帧尺寸一次性分配，之后每帧只做一次数据拷贝，不再分配内存，也不写盘。
+只有在 LogAnError 或任务失败时才把缓冲中的帧按时间顺序保存到磁盘。
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+
+from .logger import logger
+
+# 默认缓冲帧数，720p 下每帧约 2.6 MB
+DEFAULT_CAPACITY = 10
+DEFAULT_DUMP_DIR = "debug/frames"
+
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\s]')
+
+
+class FrameRingBuffer:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._frames: Optional[np.ndarray] = None
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        # 每个槽位对应的消费节点名，同一帧被多个节点使用时依次追加
+        self._names: List[List[str]] = [[] for _ in range(capacity)]
+        self._next = 0
+        self._count = 0
+        self._last_key = None
+        self._lock = threading.Lock()
+
+    def push(self, image: np.ndarray, node_name: str, key=None) -> None:
+        """
+        记录一帧及使用它的节点名
+
+        每次自定义识别拿到的都是新的图像对象，按内容校验和判断是否与上一帧相同，
+        相同时只追加节点名。key 为调用方已经算好的帧标识 (shape, crc32)，
+        不提供时在这里计算。
+        """
+        if key is None:
+            if image.flags["C_CONTIGUOUS"]:
+                key = (image.shape, zlib.crc32(image))
+            else:
+                key = (image.shape, zlib.crc32(image.tobytes()))
+
+        with self._lock:
+            if key == self._last_key and self._count:
+                names = self._names[(self._next - 1) % self.capacity]
+                if node_name not in names:
+                    names.append(node_name)
+                return
+
+            if self._frames is None or self._frames.shape[1:] != image.shape:
+                if self._frames is not None:
+                    logger.debug(
+                        f"帧尺寸变化 {self._frames.shape[1:]} -> {image.shape}，重新分配帧缓冲"
+                    )
+                self._frames = np.empty((self.capacity, *image.shape), dtype=image.dtype)
+                self._count = 0
+                self._next = 0
+
+            slot = self._next
+            np.copyto(self._frames[slot], image)
+            self._timestamps[slot] = time.time()
+            self._names[slot].clear()
+            self._names[slot].append(node_name)
+
+            self._next = (slot + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            self._last_key = key
+
+    def annotate(self, node_name: str) -> None:
+        """为最近一帧追加使用它的节点名"""
+        with self._lock:
+            if not self._count:
+                return
+            names = self._names[(self._next - 1) % self.capacity]
+            if node_name not in names:
+                names.append(node_name)
+
+    def snapshot(self):
+        """按时间顺序返回 (帧数组, 时间戳列表, 节点名列表) 的拷贝"""
+        with self._lock:
+            if not self._count:
+                return None, [], []
+            order = [
+                (self._next - self._count + i) % self.capacity
+                for i in range(self._count)
+            ]
+            frames = self._frames[order]
+            timestamps = [float(self._timestamps[i]) for i in order]
+            names = [list(self._names[i]) for i in order]
+        return frames, timestamps, names
+
+    def dump(self, reason: str, out_dir: str = DEFAULT_DUMP_DIR) -> Optional[str]:
+        """
+        将缓冲中的帧保存到 out_dir 下以时间和原因命名的子目录，返回该目录
+
+        图片由后台截图写入队列编码，index.json 记录每帧的时间和节点名。
+        """
+        # image_writer 依赖 PIL，只在需要保存时导入
+        from .image_writer import ImageJob, image_writer
+
+        frames, timestamps, names = self.snapshot()
+        if frames is None:
+            logger.debug("帧缓冲为空，无需保存")
+            return None
+
+        now = datetime.now().strftime("%Y.%m.%d-%H.%M.%S")
+        dump_dir = os.path.join(out_dir, f"{now}-{_UNSAFE_CHARS.sub('_', reason)}")
+        os.makedirs(dump_dir, exist_ok=True)
+
+        index = []
+        for i, (frame, timestamp, node_names) in enumerate(zip(frames, timestamps, names)):
+            stamp = datetime.fromtimestamp(timestamp).strftime("%H.%M.%S.%f")[:-3]
+            node = _UNSAFE_CHARS.sub("_", node_names[0])
+            file_name = f"{i:02d}-{stamp}-{node}.jpg"
+            image_writer.submit(
+                ImageJob(frame, os.path.join(dump_dir, file_name), "jpeg", 90),
+                "block",
+            )
+            index.append({"file": file_name, "time": timestamp, "nodes": node_names})
+
+        with open(os.path.join(dump_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"已保存最近 {len(index)} 帧画面至 {dump_dir}")
+        return dump_dir
+
+    def clear(self) -> None:
+        with self._lock:
+            self._count = 0
+            self._next = 0
+            self._last_key = None
+
+
+frame_buffer = FrameRingBuffer()
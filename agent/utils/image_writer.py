@@ -0,0 +1,208 @@
+"""
+后台截图编码与写入。
+
+JPEG/PNG 编码（尤其是 optimize=True）和写盘耗时可达数百毫秒，
+放在自定义动作里同步执行会阻塞整个 pipeline。
+这里用有界队列加工作线程在后台完成编码和写入，动作中只需提交帧即可返回。
+
+队列满时的处理方式（backpressure）：
+- "drop_oldest": 丢弃队列中最早的一帧，新帧入队，不阻塞调用方（默认）
+- "block": 阻塞调用方直到队列有空位
+"""
+
+import io
+import atexit
+import os
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from .logger import logger
+
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_WORKERS = 1
+
+BACKPRESSURE_POLICIES = ("drop_oldest", "block")
+
+
+class ImageJob:
+    """
+    一次截图写入任务
+
+    - frame: BGR 或单通道图像数组，提交后不应再被修改
+    - path: 保存路径
+    - format: "jpeg" 或 "png"
+    - quality: jpeg 压缩质量
+    - gray: 是否转为灰度图
+    - archive: 可选，FrameArchive，设置时追加到归档中，path 的文件名作为帧名
+    - meta: 写入归档索引的信息，见 FrameArchive.append
+    """
+
+    def __init__(
+        self,
+        frame,
+        path: str,
+        format: str = "jpeg",
+        quality: int = 70,
+        gray: bool = False,
+        archive=None,
+        meta: Optional[dict] = None,
+    ):
+        self.frame = frame
+        self.path = path
+        self.format = format
+        self.quality = quality
+        self.gray = gray
+        self.archive = archive
+        self.meta = meta or {}
+
+
+def to_pil_image(frame, gray: bool = False) -> Image.Image:
+    """
+    BGR 或单通道数组 -> PIL 图像，不产生中间的整帧数组
+
+    - BGR 三通道：由 PIL 的 raw 解码器在解包时交换通道
+    - 灰度：把 BGR 数据按 RGB 读入，再用交换过系数的矩阵直接算出亮度，
+      不需要先转成 RGB
+    """
+    if not frame.flags["C_CONTIGUOUS"]:
+        frame = np.ascontiguousarray(frame)
+    height, width = frame.shape[:2]
+
+    if frame.ndim == 2 or frame.shape[2] == 1:
+        return Image.frombuffer("L", (width, height), frame, "raw", "L", 0, 1)
+
+    if gray:
+        img = Image.frombuffer("RGB", (width, height), frame, "raw", "RGB", 0, 1)
+        # ITU-R 601: L = 0.299 R + 0.587 G + 0.114 B，按 B、G、R 的顺序排列
+        return img.convert("L", matrix=(0.114, 0.587, 0.299, 0))
+
+    return Image.frombuffer("RGB", (width, height), frame, "raw", "BGR", 0, 1)
+
+
+def save_image(job: ImageJob) -> None:
+    """编码并写入一帧"""
+    img = to_pil_image(job.frame, job.gray)
+
+    if job.archive is not None:
+        target = io.BytesIO()
+    else:
+        target = job.path
+        save_dir = os.path.dirname(job.path)
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+
+    if job.format == "jpeg":
+        img.save(target, "JPEG", quality=job.quality, optimize=True)
+    else:
+        img.save(target, "PNG", optimize=True)
+
+    if job.archive is not None:
+        job.archive.append(os.path.basename(job.path), target.getvalue(), job.meta)
+
+
+class AsyncImageWriter:
+    def __init__(
+        self,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        workers: int = DEFAULT_WORKERS,
+    ):
+        self.queue_size = queue_size
+        self.workers = workers
+        self.dropped = 0
+        self._jobs: "deque[ImageJob]" = deque()
+        # 已入队但尚未写完的任务数，用于 flush
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    def submit(self, job: ImageJob, backpressure: str = "drop_oldest") -> bool:
+        """
+        提交写入任务，返回是否入队
+
+        writer 已关闭时在调用线程中同步写入。
+        """
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"无效的 backpressure: {backpressure}")
+
+        with self._cond:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._ensure_workers()
+                if backpressure == "block":
+                    while len(self._jobs) >= self.queue_size and not self._closed:
+                        self._cond.wait()
+                elif len(self._jobs) >= self.queue_size:
+                    dropped = self._jobs.popleft()
+                    self._pending -= 1
+                    self.dropped += 1
+                    logger.warning(f"截图写入队列已满，丢弃 {dropped.path}")
+                self._jobs.append(job)
+                self._pending += 1
+                self._cond.notify_all()
+
+        if closed:
+            self._write(job)
+        return not closed
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已提交的任务全部写完，超时返回 False"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """写完队列中的任务后停止工作线程"""
+        if not self.flush(timeout):
+            logger.warning(f"截图写入未在 {timeout}s 内完成，剩余 {self._pending} 帧")
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _ensure_workers(self) -> None:
+        # 调用方需持有 self._cond
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker, name=f"image-writer-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._jobs or self._closed)
+                if not self._jobs:
+                    return
+                job = self._jobs.popleft()
+                # 队列有空位，唤醒 block 模式下等待的提交方
+                self._cond.notify_all()
+
+            self._write(job)
+
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify_all()
+
+    def _write(self, job: ImageJob) -> None:
+        try:
+            save_image(job)
+            logger.debug(f"截图已写入 {job.path}")
+        except Exception as e:
+            logger.error(f"截图写入失败 {job.path}: {e}")
+
+
+image_writer = AsyncImageWriter()
+
+# 进程退出前写完队列中剩余的截图
+atexit.register(image_writer.shutdown)
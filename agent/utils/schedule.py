@@ -0,0 +1,92 @@
+"""
+多角色任务的角色排序。
+
+切换角色时，登录流程中代价最高的是切换平台和在账号列表中查找账号，
+其次是在区服列表中查找区服；当前显示的账号、区服就是目标时，
+登录流程会直接走 "识别到当前账号/区服就是要登录的..." 节点。
+因此按 平台 -> 账号 -> 区服 分组排序，让相同平台、账号、区服的角色连续执行。
+各级分组保持首次出现的顺序，组内角色保持原有顺序。
+"""
+
+from typing import Dict, List, Optional
+
+SCHEDULE_POLICIES = ("none", "login")
+
+
+def schedule_roles(
+    rolenames: List[str],
+    roles_info: Dict[str, Dict],
+    policy: str = "none",
+) -> List[str]:
+    """
+    按策略排列角色
+
+    - "none": 保持原有顺序
+    - "login": 按 平台 -> 账号 -> 区服 分组，减少账号和平台的切换；
+      找不到账号信息的角色排在最后
+    """
+    if policy not in SCHEDULE_POLICIES:
+        raise ValueError(f"无效的角色排序策略: {policy}")
+    if policy == "none":
+        return list(rolenames)
+
+    first_seen: Dict[tuple, int] = {}
+
+    def rank(key: tuple) -> int:
+        return first_seen.setdefault(key, len(first_seen))
+
+    keyed = []
+    unknown = []
+    for index, rolename in enumerate(rolenames):
+        info = roles_info.get(rolename)
+        if not info:
+            unknown.append(rolename)
+            continue
+        platform = info["platform"]
+        account = info["account"]
+        servername = info["servername"]
+        keyed.append(
+            (
+                rank(("platform", platform)),
+                rank(("account", platform, account)),
+                rank(("server", platform, account, servername)),
+                index,
+                rolename,
+            )
+        )
+
+    keyed.sort()
+    return [item[-1] for item in keyed] + unknown
+
+
+def count_switches(rolenames: List[str], roles_info: Dict[str, Dict]) -> Dict[str, int]:
+    """统计按该顺序执行时平台、账号、区服的切换次数"""
+    switches = {"platform": 0, "account": 0, "servername": 0}
+    previous = None
+    for rolename in rolenames:
+        info = roles_info.get(rolename)
+        if not info:
+            continue
+        if previous is not None:
+            hints = login_hints(previous, info)
+            switches["platform"] += previous["platform"] != info["platform"]
+            switches["account"] += not hints["same_account"]
+            switches["servername"] += not hints["same_server"]
+        previous = info
+    return switches
+
+
+def login_hints(previous: Optional[Dict], info: Dict) -> Dict[str, bool]:
+    """
+    与上一个登录的角色相比，账号、区服是否相同（账号相同要求平台也相同）
+
+    登录流程中选择平台的节点无论如何都要执行，因此不提供平台是否相同的提示。
+    """
+    if not previous:
+        return {"same_account": False, "same_server": False}
+    same_account = (
+        previous["platform"] == info["platform"]
+        and previous["account"] == info["account"]
+    )
+    same_server = same_account and previous["servername"] == info["servername"]
+    return {"same_account": same_account, "same_server": same_server}
@@ -92,3 +92,46 @@ def is_current_period(timestamp_ms, timezone="Asia/Shanghai"):
     is_current_month = month_start <= timestamp_datetime < month_end
 
     return is_current_week, is_current_month
+
+
+def get_time_window(window_minutes, now=None, timezone="Asia/Shanghai"):
+    """
+    获取当前时间所在的时间窗口，窗口从当天0点起按固定长度划分
+
+    参数:
+        window_minutes (int): 窗口长度（分钟）
+        now (datetime): 指定时间，默认为当前时间
+        timezone: 时区字符串，默认为"Asia/Shanghai"（北京时间）
+
+    返回:
+        tuple: (window_start, window_end)
+    """
+    tz = pytz.timezone(timezone)
+    if now is None:
+        now = datetime.now(tz)
+
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed_minutes = (now - midnight).total_seconds() // 60
+    index = int(elapsed_minutes // window_minutes)
+
+    window_start = midnight + timedelta(minutes=index * window_minutes)
+    window_end = window_start + timedelta(minutes=window_minutes)
+    return window_start, window_end
+
+
+def get_game_day(now=None, reset_hour=5, timezone="Asia/Shanghai"):
+    """
+    获取当前时间所属的游戏日，每天 reset_hour 点刷新
+
+    参数:
+        now (datetime): 指定时间，默认为当前时间
+        reset_hour (int): 每日刷新时间（小时），默认为 5
+        timezone: 时区字符串，默认为"Asia/Shanghai"（北京时间）
+
+    返回:
+        str: 游戏日日期，格式为"YYYY-MM-DD"
+    """
+    if now is None:
+        now = datetime.now(pytz.timezone(timezone))
+
+    return (now - timedelta(hours=reset_hour)).strftime("%Y-%m-%d")
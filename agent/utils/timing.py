@@ -0,0 +1,136 @@
+"""
+多角色、多任务运行的结构化计时。
+
+事件以 JSON Lines 追加到 debug/timing/{日期}.jsonl，每行一个事件：
+{"ts": 时间戳, "event": 事件名, "run_id": 运行标识, ...}
+
+- run_start / run_end: 一次 ForRolesToRunTask 或 RunTaskList 运行，run_end 带 duration、status
+- role_start / role_end: 一个角色，role_end 带 duration、status（ok / failed / aborted）
+- role_skip: 跳过的角色，带 reason
+- task_start / task_end: 一个子任务，task_end 带 duration、status，登录任务带 login=true
+
+事件先放在内存缓冲中，攒够一定数量、运行结束或进程退出时再批量写入。
+汇总报表见 tools/timing_report.py。
+"""
+
+import os
+import json
+import time
+import uuid
+import atexit
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .logger import logger
+
+TIMING_DIR = "debug/timing"
+DEFAULT_BUFFER_SIZE = 64
+
+
+class TimingSink:
+    def __init__(self, log_dir: str = TIMING_DIR, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.log_dir = log_dir
+        self.buffer_size = buffer_size
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields) -> None:
+        record = {"ts": round(time.time(), 3), "event": event, **fields}
+        with self._lock:
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.buffer_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        if not records:
+            return
+
+        path = os.path.join(self.log_dir, f"{datetime.now():%Y-%m-%d}.jsonl")
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(
+                    "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+                )
+        except OSError as e:
+            logger.warning(f"写入计时记录失败: {e}")
+
+
+timing_sink = TimingSink()
+atexit.register(timing_sink.flush)
+
+
+class RunTimer:
+    """一次运行的计时，按顺序调用 role_start/task_start/task_end/role_end"""
+
+    def __init__(self, kind: str, sink: TimingSink = timing_sink, **fields):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self._sink = sink
+        self._run_begin = time.perf_counter()
+        self._role: Optional[str] = None
+        self._role_begin = 0.0
+        self._role_failed = False
+        self._task_begin: Dict[str, float] = {}
+        self._emit("run_start", kind=kind, **fields)
+
+    def role_start(self, rolename: str) -> None:
+        self._role = rolename
+        self._role_begin = time.perf_counter()
+        self._role_failed = False
+        self._emit("role_start", role=rolename)
+
+    def role_end(self, status: Optional[str] = None) -> None:
+        """结束当前角色，status 不填时按任务结果记为 ok 或 failed"""
+        if self._role is None:
+            return
+        if status is None:
+            status = "failed" if self._role_failed else "ok"
+        self._emit(
+            "role_end",
+            role=self._role,
+            duration=self._elapsed(self._role_begin),
+            status=status,
+        )
+        self._role = None
+
+    def role_skip(self, rolename: str, reason: str) -> None:
+        self._emit("role_skip", role=rolename, reason=reason)
+
+    def task_start(self, taskname: str) -> None:
+        self._task_begin[taskname] = time.perf_counter()
+        self._emit("task_start", role=self._role, task=taskname)
+
+    def task_end(self, taskname: str, succeeded: bool, login: bool = False) -> None:
+        begin = self._task_begin.pop(taskname, time.perf_counter())
+        if not succeeded:
+            self._role_failed = True
+        fields = {"login": True} if login else {}
+        self._emit(
+            "task_end",
+            role=self._role,
+            task=taskname,
+            duration=self._elapsed(begin),
+            status="ok" if succeeded else "failed",
+            **fields,
+        )
+
+    def run_end(self, status: str = "ok") -> None:
+        self._emit("run_end", duration=self._elapsed(self._run_begin), status=status)
+        self._sink.flush()
+
+    def abort(self) -> None:
+        """中止运行：结束当前角色和整个运行"""
+        self.role_end("aborted")
+        self.run_end("aborted")
+
+    def _emit(self, event: str, **fields) -> None:
+        self._sink.emit(event, run_id=self.run_id, **fields)
+
+    @staticmethod
+    def _elapsed(begin: float) -> float:
+        return round(time.perf_counter() - begin, 3)
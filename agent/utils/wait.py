@@ -0,0 +1,134 @@
+"""
+可中断的等待。
+
+所有自定义动作中的等待都应使用 cancellable_sleep 或 wait_for_screen，
+等待期间每隔 STOP_CHECK_INTERVAL 秒检查一次 tasker 是否正在停止、以及中止信号，
+界面上点击停止或 LogAnError 出错后，等待最多延迟 STOP_CHECK_INTERVAL 秒结束。
+
+子任务之间的等待：
+
+- fixed: 固定等待 wait 秒（原有行为）
+- stable: 每隔 interval 秒截图一次，连续 stable_frames 帧画面的差异都不超过阈值时结束；
+  指定 ready 节点时改为等待该节点识别成功。两种情况都以 wait 秒为上限。
+
+画面差异为按步长抽样后各像素差的绝对值均值（0-255），庭院等场景有常驻的小动画，
+阈值不宜设为 0。
+"""
+
+import time
+from time import sleep
+from typing import Optional
+
+import numpy as np
+
+from .logger import logger
+from .abort import AbortMark, abort_signal
+from .frame_buffer import frame_buffer
+
+WAIT_MODES = ("fixed", "stable")
+DEFAULT_DIFF_THRESHOLD = 3.0
+DEFAULT_INTERVAL = 0.1
+DEFAULT_STABLE_FRAMES = 3
+# 抽样步长，1280x720 抽样后为 160x90
+SAMPLE_STEP = 8
+STOP_CHECK_INTERVAL = 0.1
+
+
+def is_stopping(context, abort_mark: Optional[AbortMark] = None) -> bool:
+    """tasker 正在停止，或 abort_mark 之后出现了中止信号"""
+    if context.tasker.stopping:
+        return True
+    return abort_mark is not None and abort_signal.is_set_since(abort_mark)
+
+
+def cancellable_sleep(
+    context,
+    seconds: float,
+    abort_mark: Optional[AbortMark] = None,
+    interval: float = STOP_CHECK_INTERVAL,
+) -> bool:
+    """
+    等待 seconds 秒，停止或中止时提前结束
+
+    abort_mark 不填时只响应等待开始之后的中止信号。
+    返回 True 表示等待完成，False 表示被打断。
+    """
+    if abort_mark is None:
+        abort_mark = abort_signal.mark()
+    deadline = time.perf_counter() + seconds
+    while True:
+        if is_stopping(context, abort_mark):
+            logger.debug("等待被停止或中止打断")
+            return False
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return True
+        sleep(min(interval, remaining))
+
+
+def frame_diff(a: np.ndarray, b: np.ndarray) -> float:
+    """两帧抽样后的平均差异，尺寸不同时视为完全不同"""
+    if a.shape != b.shape:
+        return 255.0
+    a = a[::SAMPLE_STEP, ::SAMPLE_STEP].astype(np.int16)
+    b = b[::SAMPLE_STEP, ::SAMPLE_STEP].astype(np.int16)
+    return float(np.abs(a - b).mean())
+
+
+def wait_for_screen(
+    context,
+    max_wait: float,
+    mode: str = "fixed",
+    ready: Optional[str] = None,
+    threshold: float = DEFAULT_DIFF_THRESHOLD,
+    interval: float = DEFAULT_INTERVAL,
+    stable_frames: int = DEFAULT_STABLE_FRAMES,
+    abort_mark: Optional[AbortMark] = None,
+) -> float:
+    """
+    等待画面就绪，返回实际等待的秒数；停止或中止时提前返回
+    """
+    if mode not in WAIT_MODES:
+        raise ValueError(f"无效的等待模式: {mode}")
+    begin = time.perf_counter()
+    if mode == "fixed" or max_wait <= 0:
+        cancellable_sleep(context, max(max_wait, 0), abort_mark)
+        return time.perf_counter() - begin
+
+    if abort_mark is None:
+        abort_mark = abort_signal.mark()
+    controller = context.tasker.controller
+    deadline = begin + max_wait
+    previous = None
+    stable_count = 1
+
+    while True:
+        if is_stopping(context, abort_mark):
+            logger.debug("等待被停止或中止打断")
+            return time.perf_counter() - begin
+        controller.post_screencap().wait()
+        image = controller.cached_image
+        frame_buffer.push(image, ready or "wait_for_screen")
+
+        if ready:
+            reco_detail = context.run_recognition(ready, image)
+            if reco_detail is not None and reco_detail.best_result is not None:
+                break
+        elif previous is not None:
+            if frame_diff(previous, image) <= threshold:
+                stable_count += 1
+                if stable_count >= stable_frames:
+                    break
+            else:
+                stable_count = 1
+        previous = image
+
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            logger.debug(f"等待画面就绪超时（{max_wait}s）")
+            return time.perf_counter() - begin
+        sleep(min(interval, remaining))
+
+    elapsed = time.perf_counter() - begin
+    logger.debug(f"画面已就绪，等待 {elapsed:.2f}s（上限 {max_wait}s）")
+    return elapsed
@@ -0,0 +1,130 @@
+"""
+MultiRecognition 顺序/并行识别耗时对比。
+
+使用录制好的截图（调试控制器轮播图片）作为输入，分别以 2、4、8 个 OCR 子节点
+构造 MultiRecognition，比较 parallel=false 与 parallel=true 时单帧的识别耗时。
+
+用法：
+    python tools/benchmark_multi_recognition.py <截图目录> [每组帧数]
+
+截图应为 1280x720 的游戏画面，资源目录固定为 assets/resource/base（需已放置 OCR 模型）。
+"""
+
+import sys
+import time
+import statistics
+from pathlib import Path
+from typing import List
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "agent"))
+
+from maa.resource import Resource
+from maa.controller import DbgController
+from maa.tasker import Tasker, LoggingLevelEnum
+from maa.define import MaaDbgControllerTypeEnum
+
+from custom.reco.cache import recognition_cache
+from custom.reco.general import MultiRecognition
+
+CHILD_COUNTS = [2, 4, 8]
+
+# 子节点 ROI：将画面切成 2 行 4 列，每个子节点对一块区域做 OCR
+CHILD_ROIS = [
+    [x * 320, y * 360, 320, 360] for y in range(2) for x in range(4)
+]
+
+
+class TimedMultiRecognition(MultiRecognition):
+    """记录每次 analyze 耗时的 MultiRecognition"""
+
+    def __init__(self):
+        super().__init__()
+        self.samples: List[float] = []
+
+    def analyze(self, context, argv):
+        begin = time.perf_counter()
+        try:
+            return super().analyze(context, argv)
+        finally:
+            self.samples.append(time.perf_counter() - begin)
+
+
+def build_override(child_count: int, parallel: bool) -> dict:
+    children = [f"BENCH-子节点{i}" for i in range(child_count)]
+    # 每个子节点都写成 ($i OR NOT $i)，保证顺序模式下也会识别全部子节点
+    expression = " AND ".join(f"(${i} OR NOT ${i})" for i in range(child_count))
+
+    override = {
+        name: {"recognition": "OCR", "roi": CHILD_ROIS[i], "only_rec": True}
+        for i, name in enumerate(children)
+    }
+    override["BENCH-入口"] = {
+        "recognition": "Custom",
+        "custom_recognition": "TimedMultiRecognition",
+        "custom_recognition_param": {
+            "nodes": children,
+            "logic": {"type": "CUSTOM", "expression": expression},
+            "return": [0, 0, 1, 1],
+            "parallel": parallel,
+        },
+        "action": "DoNothing",
+    }
+    return override
+
+
+def run(frames_dir: Path, frames_per_case: int) -> None:
+    Tasker.set_stdout_level(LoggingLevelEnum.Off)
+
+    resource = Resource()
+    resource.post_bundle(str(project_root / "assets" / "resource" / "base")).wait()
+    recognition = TimedMultiRecognition()
+    resource.register_custom_recognition("TimedMultiRecognition", recognition)
+
+    controller = DbgController(
+        str(frames_dir),
+        str(project_root / "debug" / "benchmark"),
+        MaaDbgControllerTypeEnum.CarouselImage,
+    )
+    controller.post_connection().wait()
+
+    tasker = Tasker()
+    tasker.bind(resource, controller)
+    if not tasker.inited:
+        print("Tasker 初始化失败")
+        sys.exit(1)
+
+    print(f"{'子节点数':<8}{'模式':<10}{'p50(ms)':>10}{'p95(ms)':>10}{'均值(ms)':>10}")
+    for child_count in CHILD_COUNTS:
+        for parallel in (False, True):
+            override = build_override(child_count, parallel)
+            recognition.samples.clear()
+            for _ in range(frames_per_case):
+                # 轮播的帧会重复，两种模式也识别同样的帧，每次清空缓存以测量实际识别耗时
+                recognition_cache.clear()
+                tasker.post_task("BENCH-入口", override).wait()
+
+            samples = sorted(s * 1000 for s in recognition.samples)
+            if not samples:
+                print(f"{child_count:<8}{'并行' if parallel else '顺序':<10}无结果")
+                continue
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            print(
+                f"{child_count:<8}{'并行' if parallel else '顺序':<10}"
+                f"{statistics.median(samples):>10.1f}{p95:>10.1f}"
+                f"{statistics.mean(samples):>10.1f}"
+            )
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark_multi_recognition.py <frames_dir> [frames_per_case]")
+        sys.exit(1)
+
+    frames_dir = Path(sys.argv[1])
+    frames_per_case = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    run(frames_dir, frames_per_case)
+
+
+if __name__ == "__main__":
+    main()
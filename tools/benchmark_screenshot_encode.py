@@ -0,0 +1,95 @@
+"""
+截图编码路径的内存与耗时对比。
+
+对比旧的编码路径（切片交换通道 + Image.fromarray + convert("L")）与
+utils.image_writer.to_pil_image 的直接编码路径，分别统计：
+- 转换为 PIL 图像阶段的 Python/NumPy 侧分配字节数（tracemalloc 峰值，
+  PIL 内部的图像内存不经过 Python 分配器，不计入）
+- 转换耗时，以及加上 JPEG 编码（写入内存）后的单帧总耗时
+
+用法：
+    python tools/benchmark_screenshot_encode.py [每组帧数]
+"""
+
+import io
+import sys
+import time
+import statistics
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "agent"))
+
+from utils.image_writer import to_pil_image
+
+RESOLUTIONS = [(1280, 720), (1920, 1080)]
+
+
+def legacy_pil_image(frame: np.ndarray, gray: bool = False) -> Image.Image:
+    """原 Screenshot.run 中的转换方式"""
+    img = Image.fromarray(frame[:, :, ::-1])
+    if gray:
+        img = img.convert("L")
+    return img
+
+
+def make_frame(width: int, height: int) -> np.ndarray:
+    """带渐变和噪声的 BGR 画面，避免纯随机数据让 JPEG 编码耗时失真"""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[..., 0] = (x + y) / 2
+    frame[..., 1] = y
+    frame[..., 2] = x
+    noise = rng.integers(0, 16, size=frame.shape, dtype=np.uint8)
+    return frame + noise
+
+
+def measure(convert, frame: np.ndarray, gray: bool, frames: int):
+    tracemalloc.start()
+    convert(frame, gray)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    convert_samples = []
+    total_samples = []
+    for _ in range(frames):
+        begin = time.perf_counter()
+        img = convert(frame, gray)
+        converted = time.perf_counter()
+        img.save(io.BytesIO(), "JPEG", quality=70, optimize=True)
+        end = time.perf_counter()
+        convert_samples.append((converted - begin) * 1000)
+        total_samples.append((end - begin) * 1000)
+
+    return peak, statistics.median(convert_samples), statistics.median(total_samples)
+
+
+def run(frames: int) -> None:
+    print(
+        f"{'分辨率':<12}{'灰度':<6}{'路径':<8}"
+        f"{'分配(KB)':>12}{'转换(ms)':>12}{'总计(ms)':>12}"
+    )
+    for width, height in RESOLUTIONS:
+        frame = make_frame(width, height)
+        for gray in (False, True):
+            for name, convert in (("旧", legacy_pil_image), ("新", to_pil_image)):
+                peak, convert_ms, total_ms = measure(convert, frame, gray, frames)
+                print(
+                    f"{f'{width}x{height}':<12}{'是' if gray else '否':<6}{name:<8}"
+                    f"{peak / 1024:>12.1f}{convert_ms:>12.2f}{total_ms:>12.2f}"
+                )
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    run(frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+截图归档读取工具。
+
+只读取索引文件定位帧，再按偏移从容器中读出对应数据，不会扫描整个容器。
+
+用法：
+    python tools/screenshot_archive.py list <归档目录> [日期]
+    python tools/screenshot_archive.py extract <归档目录> <角色名|HH:MM[:SS]> [日期] [输出目录]
+
+- 日期格式为 YYYY.MM.DD，不填时 list 列出所有日期，extract 使用最近一天
+- extract 第二个参数形如时间时，取该时间及之前最近的一帧；否则按角色名取当天该角色的所有帧
+"""
+
+import os
+import re
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "agent"))
+
+from utils.archive import list_days, read_frame, read_index
+
+TIME_PATTERN = re.compile(r"^\d{1,2}:\d{2}(:\d{2})?$")
+
+
+def list_archive(archive_dir: str, day: str = None) -> None:
+    days = [day] if day else list_days(archive_dir)
+    if not days:
+        print("归档目录中没有记录")
+        return
+
+    for day in days:
+        records = read_index(archive_dir, day)
+        print(f"{day}: {len(records)} 帧")
+        if len(days) == 1:
+            for record in records:
+                print(f"  {record['time']}  {record['rolename']}  {record['name']}")
+
+
+def select_records(records, key: str):
+    if TIME_PATTERN.match(key):
+        target = key if key.count(":") == 2 else key + ":59"
+        target = target.zfill(8)
+        candidates = [r for r in records if r["time"][11:19] <= target]
+        return candidates[-1:]
+    return [r for r in records if r["rolename"] == key]
+
+
+def extract(archive_dir: str, key: str, day: str = None, out_dir: str = ".") -> None:
+    if day is None:
+        days = list_days(archive_dir)
+        if not days:
+            print("归档目录中没有记录")
+            return
+        day = days[-1]
+
+    records = select_records(read_index(archive_dir, day), key)
+    if not records:
+        print(f"{day} 中没有与 {key} 匹配的截图")
+        return
+
+    os.makedirs(out_dir, exist_ok=True)
+    for record in records:
+        out_path = os.path.join(out_dir, record["name"])
+        with open(out_path, "wb") as f:
+            f.write(read_frame(archive_dir, record))
+        print(f"已导出 {out_path}")
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("list", "extract"):
+        print(
+            "Usage: python screenshot_archive.py list <archive_dir> [day]\n"
+            "       python screenshot_archive.py extract <archive_dir> <rolename|HH:MM[:SS]> [day] [out_dir]"
+        )
+        sys.exit(1)
+
+    command, archive_dir = sys.argv[1], sys.argv[2]
+    if command == "list":
+        list_archive(archive_dir, sys.argv[3] if len(sys.argv) > 3 else None)
+        return
+
+    if len(sys.argv) < 4:
+        print("extract 需要指定角色名或时间")
+        sys.exit(1)
+    extract(
+        archive_dir,
+        sys.argv[3],
+        sys.argv[4] or None if len(sys.argv) > 4 else None,
+        sys.argv[5] if len(sys.argv) > 5 else ".",
+    )
+
+
+if __name__ == "__main__":
+    main()
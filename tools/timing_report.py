@@ -0,0 +1,148 @@
+"""
+多角色运行计时报表。
+
+读取 agent 写入的计时记录（debug/timing/*.jsonl），输出：
+- 每次运行：角色数、总耗时、每小时完成的角色数
+- 每个任务：次数、失败次数、p50 / p95 耗时，登录任务单独汇总
+- 耗时最长的角色
+
+用法：
+    python tools/timing_report.py [计时记录文件或目录...] [--top N]
+
+不指定文件时读取 debug/timing 下的全部记录。
+"""
+
+import sys
+import json
+import math
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+DEFAULT_TIMING_DIR = Path("debug") / "timing"
+
+
+def percentile(values: List[float], q: float) -> float:
+    """最近秩百分位数"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def load_events(paths: List[Path]) -> List[Dict]:
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(path.glob("*.jsonl")))
+        elif path.exists():
+            files.append(path)
+        else:
+            print(f"跳过不存在的路径: {path}")
+
+    events = []
+    for file in files:
+        with open(file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return events
+
+
+def report_runs(events: List[Dict]) -> None:
+    runs: Dict[str, Dict] = defaultdict(lambda: {"roles": 0})
+    for event in events:
+        run = runs[event.get("run_id")]
+        if event["event"] == "run_start":
+            run["kind"] = event.get("kind")
+            run["start"] = event["ts"]
+        elif event["event"] == "run_end":
+            run["duration"] = event["duration"]
+            run["status"] = event["status"]
+        elif event["event"] == "role_end" and event["status"] != "aborted":
+            run["roles"] += 1
+
+    print("== 运行 ==")
+    print(f"{'开始时间':<20}{'类型':<20}{'角色数':>8}{'耗时(分)':>10}{'角色/小时':>10}  状态")
+    for run in sorted(runs.values(), key=lambda r: r.get("start", 0)):
+        if "start" not in run or run.get("kind") != "ForRolesToRunTask":
+            continue
+        duration = run.get("duration")
+        start = _format_ts(run["start"])
+        if not duration:
+            print(f"{start:<20}{run['kind']:<20}{run['roles']:>8}{'-':>10}{'-':>10}  未结束")
+            continue
+        rate = run["roles"] / (duration / 3600)
+        print(
+            f"{start:<20}{run['kind']:<20}{run['roles']:>8}"
+            f"{duration / 60:>10.1f}{rate:>10.1f}  {run['status']}"
+        )
+
+
+def report_tasks(events: List[Dict]) -> None:
+    durations: Dict[str, List[float]] = defaultdict(list)
+    failures: Dict[str, int] = defaultdict(int)
+    logins: List[float] = []
+    for event in events:
+        if event["event"] != "task_end":
+            continue
+        durations[event["task"]].append(event["duration"])
+        if event["status"] != "ok":
+            failures[event["task"]] += 1
+        if event.get("login"):
+            logins.append(event["duration"])
+
+    print("\n== 任务 ==")
+    print(f"{'任务':<36}{'次数':>6}{'失败':>6}{'p50(s)':>10}{'p95(s)':>10}")
+    for task, values in sorted(durations.items(), key=lambda kv: -sum(kv[1])):
+        print(
+            f"{task:<36}{len(values):>6}{failures[task]:>6}"
+            f"{percentile(values, 0.5):>10.1f}{percentile(values, 0.95):>10.1f}"
+        )
+    if logins:
+        print(
+            f"\n登录: {len(logins)} 次, p50 {percentile(logins, 0.5):.1f}s, "
+            f"p95 {percentile(logins, 0.95):.1f}s"
+        )
+
+
+def report_slowest_roles(events: List[Dict], top: int) -> None:
+    roles = [e for e in events if e["event"] == "role_end"]
+    roles.sort(key=lambda e: e["duration"], reverse=True)
+
+    print(f"\n== 耗时最长的 {top} 个角色 ==")
+    print(f"{'时间':<20}{'角色':<24}{'耗时(s)':>10}  状态")
+    for event in roles[:top]:
+        print(
+            f"{_format_ts(event['ts']):<20}{event['role']:<24}"
+            f"{event['duration']:>10.1f}  {event['status']}"
+        )
+
+
+def _format_ts(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main():
+    args = sys.argv[1:]
+    top = 10
+    if "--top" in args:
+        index = args.index("--top")
+        top = int(args[index + 1])
+        del args[index : index + 2]
+
+    paths = [Path(arg) for arg in args] or [DEFAULT_TIMING_DIR]
+    events = load_events(paths)
+    if not events:
+        print("没有计时记录")
+        sys.exit(1)
+
+    report_runs(events)
+    report_tasks(events)
+    report_slowest_roles(events, top)
+
+
+if __name__ == "__main__":
+    main()